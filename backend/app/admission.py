@@ -0,0 +1,83 @@
+# backend/app/admission.py
+import asyncio
+import os
+import time
+
+# Llamadas /stt simultáneas que acepta un worker antes de rechazar nuevas.
+MAX_CALLS = int(os.getenv("STT_MAX_CALLS", "20"))
+# Tope de audio pendiente por llamada; por encima se descarta lo más antiguo.
+MAX_BUFFER_BYTES = int(os.getenv("STT_MAX_BUFFER_BYTES", str(1024 * 1024)))
+# Retraso del event loop a partir del cual el worker se considera saturado.
+LOOP_LAG_LIMIT_SECONDS = float(os.getenv("LOOP_LAG_LIMIT_SECONDS", "0.5"))
+LAG_PROBE_INTERVAL = 0.25
+
+
+class AdmissionController:
+    """
+    Control de admisión por worker para las llamadas del WebSocket /stt.
+
+    Limita las llamadas concurrentes y mide el retraso del event loop con una
+    tarea de sondeo; si cualquiera de los dos supera su límite, el worker deja
+    de estar listo y las llamadas nuevas se degradan a <Say>.
+    """
+
+    def __init__(
+        self, max_calls: int = MAX_CALLS, lag_limit: float = LOOP_LAG_LIMIT_SECONDS
+    ) -> None:
+        self.max_calls = max_calls
+        self.lag_limit = lag_limit
+        self.active = 0
+        self.rejected = 0
+        self.shed_bytes = 0
+        self.loop_lag = 0.0
+        self._probe: asyncio.Task | None = None
+
+    def overloaded(self) -> bool:
+        self.ensure_probe()
+        return self.active >= self.max_calls or self.loop_lag > self.lag_limit
+
+    def try_admit(self) -> bool:
+        """Reserva un hueco para una llamada; False si el worker está saturado."""
+        if self.overloaded():
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active = max(0, self.active - 1)
+
+    def shed(self, nbytes: int) -> None:
+        """Registra audio descartado por superar MAX_BUFFER_BYTES."""
+        self.shed_bytes += nbytes
+
+    def status(self) -> dict:
+        return {
+            "ready": not self.overloaded(),
+            "active_calls": self.active,
+            "max_calls": self.max_calls,
+            "rejected_calls": self.rejected,
+            "shed_bytes": self.shed_bytes,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+        }
+
+    def ensure_probe(self) -> None:
+        """Arranca el sondeo de lag en el loop actual si no está corriendo."""
+        if self._probe is not None and not self._probe.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Fuera de un loop (p.ej. endpoints síncronos): no hay lag que medir
+        self._probe = loop.create_task(self._probe_lag())
+
+    async def _probe_lag(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = max(0.0, time.monotonic() - started - LAG_PROBE_INTERVAL)
+            # Media móvil exponencial para no reaccionar a un único pico.
+            self.loop_lag = 0.7 * self.loop_lag + 0.3 * lag
+
+
+controller = AdmissionController()
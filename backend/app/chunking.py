@@ -0,0 +1,89 @@
+# backend/app/chunking.py
+import os
+
+# Límites de la duración de cada bloque enviado a Whisper.
+CHUNK_MIN_SECONDS = float(os.getenv("STT_CHUNK_MIN_SECONDS", "2"))
+CHUNK_MAX_SECONDS = float(os.getenv("STT_CHUNK_MAX_SECONDS", "10"))
+
+# Presión = (RTT + audio pendiente) / duración del bloque.
+HIGH_PRESSURE = 0.8  # Por encima: bloques más grandes, menos peticiones
+LOW_PRESSURE = 0.3  # Por debajo: bloques más pequeños, menos latencia
+GROW_FACTOR = 1.25
+SHRINK_STEP = 0.5
+WARMUP_SAMPLES = 3
+EWMA_ALPHA = 0.3
+
+
+class ChunkController:
+    """
+    Controlador de realimentación de la duración de bloque.
+
+    Crece de forma multiplicativa cuando Whisper o la cola no dan abasto y
+    decrece de a poco cuando sobra margen, siempre dentro de [min, max].
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_seconds: float = CHUNK_MIN_SECONDS,
+        max_seconds: float = CHUNK_MAX_SECONDS,
+    ) -> None:
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.seconds = min(max(initial, min_seconds), max_seconds)
+        self.rtt = 0.0
+        self.samples = 0
+        self.grows = 0
+        self.shrinks = 0
+
+    def observe(self, rtt: float, backlog_seconds: float) -> float:
+        """Registra un bloque transcrito y devuelve la nueva duración."""
+        self.samples += 1
+        self.rtt = (
+            rtt if self.samples == 1 else EWMA_ALPHA * rtt + (1 - EWMA_ALPHA) * self.rtt
+        )
+        if self.samples < WARMUP_SAMPLES:
+            return self.seconds
+
+        pressure = (self.rtt + backlog_seconds) / self.seconds
+        if pressure > HIGH_PRESSURE and self.seconds < self.max_seconds:
+            self.seconds = min(self.max_seconds, self.seconds * GROW_FACTOR)
+            self.grows += 1
+        elif pressure < LOW_PRESSURE and self.seconds > self.min_seconds:
+            self.seconds = max(self.min_seconds, self.seconds - SHRINK_STEP)
+            self.shrinks += 1
+        return self.seconds
+
+    def metrics(self) -> dict:
+        return {
+            "chunk_seconds": round(self.seconds, 3),
+            "rtt_ewma_ms": round(self.rtt * 1000, 1),
+            "samples": self.samples,
+            "grows": self.grows,
+            "shrinks": self.shrinks,
+        }
+
+
+class CallChunker:
+    """Duración efectiva de una llamada: la mayor entre la suya y la del worker."""
+
+    def __init__(
+        self, worker_controller: ChunkController, sample_rate: int, initial: float
+    ) -> None:
+        self.worker = worker_controller
+        self.sample_rate = sample_rate
+        self.call = ChunkController(
+            initial, worker_controller.min_seconds, worker_controller.max_seconds
+        )
+
+    @property
+    def seconds(self) -> float:
+        return max(self.call.seconds, self.worker.seconds)
+
+    def chunk_bytes(self) -> int:
+        return int(self.seconds * self.sample_rate)  # μ-law: 1 byte por muestra
+
+    def observe(self, rtt: float, backlog_bytes: int) -> None:
+        backlog_seconds = backlog_bytes / self.sample_rate
+        self.call.observe(rtt, backlog_seconds)
+        self.worker.observe(rtt, backlog_seconds)
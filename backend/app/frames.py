@@ -0,0 +1,59 @@
+# backend/app/frames.py
+"""Parser de mensajes de Twilio Media Streams.
+
+Los mensajes `media` llegan cada 20 ms por llamada, así que su payload se
+extrae sin construir el diccionario completo. El resto de eventos pasa por
+el parser JSON (orjson si está instalado).
+"""
+
+import binascii
+import json
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+_MEDIA_EVENTS = ('"event":"media"', '"event": "media"')
+_PAYLOAD_KEY = '"payload"'
+
+
+def loads(text: str) -> dict:
+    """Parsea un mensaje completo; lanza json.JSONDecodeError si no es JSON."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def media_payload(text: str) -> str | None:
+    """
+    Devuelve el payload base64 de un mensaje `media` sin parsear todo el JSON.
+
+    None si el mensaje no es `media` o no tiene la forma esperada; en ese caso
+    el llamador debe usar `loads`.
+    """
+    if _MEDIA_EVENTS[0] not in text and _MEDIA_EVENTS[1] not in text:
+        return None
+    i = text.find(_PAYLOAD_KEY)
+    if i < 0:
+        return None
+    colon = text.find(":", i + len(_PAYLOAD_KEY))
+    if colon < 0:
+        return None
+    i = text.find('"', colon + 1)
+    if i < 0:
+        return None
+    j = text.find('"', i + 1)
+    if j < 0:
+        return None
+    payload = text[i + 1 : j]
+    if "\\" in payload:
+        return None  # Escapes JSON (p.ej. "\/"): mejor el parser completo
+    return payload
+
+
+def decode_into(buffer: bytearray, payload_b64: str) -> bytes:
+    """Decodifica el payload, lo añade al búfer de la llamada y devuelve la trama."""
+    frame = binascii.a2b_base64(payload_b64)
+    buffer += frame
+    return frame
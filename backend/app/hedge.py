@@ -0,0 +1,131 @@
+# backend/app/hedge.py
+import asyncio
+import inspect
+import os
+import time
+from collections import deque
+from typing import Any, Callable
+
+# Lanza una petición duplicada si la primera supera el p90 observado.
+HEDGE_ENABLED = os.getenv("STT_HEDGE", "1") == "1"
+# Fracción máxima de peticiones que pueden duplicarse (controla el gasto).
+HEDGE_BUDGET = float(os.getenv("STT_HEDGE_BUDGET", "0.1"))
+# Tiempo máximo por bloque de audio, incluida la petición duplicada.
+CHUNK_DEADLINE_SECONDS = float(os.getenv("STT_CHUNK_DEADLINE_SECONDS", "6"))
+
+HEDGE_PERCENTILE = 0.9
+MIN_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 2.0
+WINDOW = 200
+
+
+class HedgedRequester:
+    """
+    Ejecuta una corrutina (o una función bloqueante, en un hilo) con deadline
+    y, si tarda más que el percentil 90 reciente, lanza una segunda copia;
+    gana la primera en responder y la otra se cancela.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = HEDGE_ENABLED,
+        budget: float = HEDGE_BUDGET,
+        deadline: float = CHUNK_DEADLINE_SECONDS,
+    ) -> None:
+        self.enabled = enabled
+        self.budget = budget
+        self.deadline = deadline
+        self.latencies: deque[float] = deque(maxlen=WINDOW)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+        self.failures = 0
+
+    def hedge_delay(self) -> float:
+        """Percentil 90 de las latencias recientes (o un valor fijo al arrancar)."""
+        if len(self.latencies) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE))]
+
+    def _may_hedge(self) -> bool:
+        return self.enabled and self.hedged < self.budget * self.requests
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Devuelve el primer resultado correcto, o None si todos los intentos
+        fallan o se agota el deadline. Una excepción nunca gana: si el intento
+        original falla antes del p90, la copia se lanza de inmediato.
+        """
+        self.requests += 1
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        hedge_at = started + min(self.hedge_delay(), self.deadline)
+        attempts: dict[asyncio.Task, tuple[float, bool]] = {}
+        pending: set[asyncio.Task] = set()
+
+        def launch(is_hedge: bool) -> None:
+            if inspect.iscoroutinefunction(fn):
+                task = asyncio.ensure_future(fn(*args))
+            else:
+                task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            attempts[task] = (time.monotonic(), is_hedge)
+            pending.add(task)
+
+        launch(False)
+        try:
+            while True:
+                can_hedge = len(attempts) == 1 and self._may_hedge()
+                if not pending and not can_hedge:
+                    return None  # Todos los intentos fallaron
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                if pending:
+                    wake = min(hedge_at, deadline_at) if can_hedge else deadline_at
+                    done, _ = await asyncio.wait(
+                        pending,
+                        timeout=max(0.0, wake - now),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        pending.discard(task)
+                        if task.exception() is not None:
+                            self.failures += 1
+                            print(f"Hedged request failed: {task.exception()}")
+                            continue
+                        attempt_started, is_hedge = attempts[task]
+                        self.latencies.append(time.monotonic() - attempt_started)
+                        if is_hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                if can_hedge and (not pending or time.monotonic() >= hedge_at):
+                    self.hedged += 1
+                    launch(True)
+
+            # Muestra censurada: la latencia real fue al menos el deadline.
+            self.latencies.append(self.deadline)
+            self.deadline_misses += 1
+            print(f"Request missed its {self.deadline}s deadline.")
+            return None
+        finally:
+            # Las corrutinas se cancelan de verdad (se cierra la petición);
+            # un hilo no se puede interrumpir y su resultado se descarta.
+            for task in attempts:
+                task.cancel()
+
+    def metrics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0,
+            "deadline_misses": self.deadline_misses,
+            "failures": self.failures,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+        }
+
+
+requester = HedgedRequester()
@@ -1,49 +1,78 @@
 # backend/app/main.py
+import asyncio
+import json
 import os
 from fastapi import FastAPI, Response, WebSocket
-import json # Necesario para parsear el mensaje inicial del WebSocket
 
 from .tts import speak
-from . import stt, wer
+from . import admission, hedge, playback, sessions, store, stt, transcript_cache
+from . import twiml, wer
 
 app = FastAPI()
 
+GREETING_TEXT = (
+    "Nuestra misión es compartir la belleza de las palabras "
+    "y las historias que se tejen con ellas."
+)
+
+# "start": <Start><Stream> unidireccional y saludo con <Play>.
+# "connect": <Connect><Stream> bidireccional; el audio de respuesta va por /stt.
+STREAM_MODE = os.environ.get("TWILIO_STREAM_MODE", "start")
+WEBSOCKET_URL = os.environ.get("TWILIO_WEBSOCKET_URL", "wss://insightia-production.up.railway.app/stt")
+# Presupuesto para encontrar el saludo en la caché de R2 antes de usar <Say>.
+TTS_DEADLINE_SECONDS = float(os.environ.get("TTS_DEADLINE_SECONDS", "0.25"))
+
+_greeting_task: asyncio.Task | None = None
+# El saludo es constante y su clave en R2 depende solo del contenido: una vez
+# resuelta, la URL no cambia durante la vida del proceso.
+_greeting_audio_url: str | None = None
+
 @app.websocket("/stt")
 async def websocket_stt(websocket: WebSocket):
     """
     Recibe audio μ-law de Twilio Media Streams y delega el procesamiento.
-    Intenta extraer el call_id de los metadatos iniciales de Twilio.
+    Intenta extraer el call_id y el streamSid de los metadatos iniciales de Twilio.
+    Si el worker está saturado rechaza la conexión con 1013 (try again later).
     """
+    if not admission.controller.try_admit():
+        print("Worker overloaded, rejecting /stt connection.")
+        await websocket.close(code=1013)
+        return
+    try:
+        await _handle_stt(websocket)
+    finally:
+        admission.controller.release()
+
+
+async def _handle_stt(websocket: WebSocket) -> None:
     await websocket.accept() # Aceptar la conexión WebSocket
 
     call_id = "unknown-call" # Valor por defecto
+    player = None
 
     try:
-        # El primer mensaje de Twilio Media Streams suele ser un JSON con el evento "start"
+        # Twilio envía "connected" y después "start" con los metadatos de la llamada
         initial_message = await websocket.receive_json()
+        while initial_message.get("event") == "connected":
+            initial_message = await websocket.receive_json()
         if initial_message.get("event") == "start":
-            call_sid = initial_message.get("start", {}).get("callSid")
+            start = initial_message.get("start", {})
+            call_sid = start.get("callSid")
             if call_sid:
                 call_id = call_sid
                 print(f"[{call_id}] Received callSid: {call_id}") # Para depuración
+            stream_sid = initial_message.get("streamSid") or start.get("streamSid")
+            if stream_sid:
+                player = playback.AudioPlayer(websocket, stream_sid)
     except Exception as e:
         print(f"Error receiving initial WebSocket message or call_id: {e}")
         # Continuar con el call_id por defecto si falla la obtención
-    
-    # stt.process_stream ahora debe ser una función asíncrona
-    # En backend/app/main.py, dentro de websocket_stt
-    try:
-        initial_message = await websocket.receive_json()
-        print(f"DEBUG: Initial WebSocket message from Twilio: {json.dumps(initial_message, indent=2)}") # Añade esto
-        if initial_message.get("event") == "start":
-            call_sid = initial_message.get("start", {}).get("callSid")
-            if call_sid:
-                call_id = call_sid
-                print(f"[{call_id}] Received callSid: {call_id}")
-    except Exception as e:
-        print(f"Error receiving initial WebSocket message or call_id: {e}")
-        
-    await stt.process_stream(websocket, call_id)
+
+    # En modo bidireccional el saludo se envía por el propio WebSocket.
+    if player and STREAM_MODE == "connect":
+        player.say(GREETING_TEXT)
+
+    await stt.process_stream(websocket, call_id, player)
     print(f"[{call_id}] WebSocket connection closed.")
 
 
@@ -63,9 +92,51 @@ def metrics():
     return wer.metrics.metrics()
 
 
+@app.get("/metrics/stt")
+def stt_metrics() -> dict:
+    """Métricas del pipeline STT de este worker."""
+    return {
+        "admission": admission.controller.status(),
+        "hedge": hedge.requester.metrics(),
+        "transcript_cache": transcript_cache.cache.metrics(),
+        "chunking": stt.worker_chunks.metrics(),
+    }
+
+
+@app.get("/calls")
+def calls() -> dict:
+    """Llamadas activas en este worker con su consumo de memoria."""
+    return sessions.registry.snapshot()
+
+
+@app.get("/calls/{call_id}/transcript")
+def call_transcript(call_id: str, offset: int = 0, limit: int = 50) -> dict:
+    """Transcripción paginada de una llamada desde el almacén local."""
+    segments = store.store.transcript(call_id, offset=offset, limit=limit)
+    return {"call_id": call_id, "offset": offset, "limit": limit, "segments": segments}
+
+
+@app.get("/transcripts/search")
+def search_transcripts(q: str, limit: int = 20) -> dict:
+    """Búsqueda de texto completo en las transcripciones locales."""
+    return {"query": q, "results": store.store.search(q, limit=limit)}
+
+
 @app.get("/health")
-async def health() -> dict[str, str]:
-    """Health check endpoint used by the platform."""
+async def health():
+    """Health check endpoint used by the platform.
+
+    Responde 503 cuando el worker está saturado para que el balanceador
+    deje de enviarle llamadas.
+    """
+    # La plataforma consulta /health al arrancar: buen momento para replicar
+    # las transcripciones que dejó pendientes el proceso anterior.
+    store.store.ensure_syncer()
+    if admission.controller.overloaded():
+        body = {"status": "overloaded", **admission.controller.status()}
+        return Response(
+            content=json.dumps(body), media_type="application/json", status_code=503
+        )
     return {"status": "ok"}
 
 
@@ -75,52 +146,40 @@ async def voice():
     Devuelve TwiML que reproduce un saludo TTS de OpenAI y luego
     inicia Twilio Media Streams para STT y espera la entrada del usuario.
     """
-    initial_greeting_text = "Nuestra misión es compartir la belleza de las palabras y las historias que se tejen con ellas."
-    
-    greeting_audio_url = None
+    if admission.controller.overloaded():
+        # Worker saturado: saludo con <Say> y sin Media Stream.
+        twiml_doc = twiml.render_say(GREETING_TEXT)
+    elif STREAM_MODE == "connect":
+        # Sin <Play>: el saludo sale por el WebSocket sin pasar por R2.
+        twiml_doc = twiml.render_connect(WEBSOCKET_URL)
+    else:
+        greeting_audio_url = await _greeting_url(TTS_DEADLINE_SECONDS)
+        twiml_doc = twiml.render_start(WEBSOCKET_URL, greeting_audio_url, GREETING_TEXT)
+    return Response(content=twiml_doc, media_type="text/xml")
+
+
+async def _greeting_url(budget: float) -> str | None:
+    """
+    URL del saludo en R2, o None si la caché no responde dentro de `budget`.
+    La búsqueda sigue en segundo plano para que la próxima llamada la encuentre;
+    una vez resuelta se devuelve sin esperar y solo se reintenta tras un error.
+    """
+    global _greeting_task
+    if _greeting_audio_url is not None:
+        return _greeting_audio_url
+    if _greeting_task is None or _greeting_task.done():
+        _greeting_task = asyncio.create_task(speak(GREETING_TEXT))
+        _greeting_task.add_done_callback(_remember_greeting_url)
     try:
-        greeting_audio_url = await speak(initial_greeting_text)
+        return await asyncio.wait_for(asyncio.shield(_greeting_task), budget)
+    except asyncio.TimeoutError:
+        print(f"TTS greeting lookup exceeded {budget}s, falling back to <Say>.")
     except Exception as e:
         print(f"Error generating TTS audio for greeting: {e}")
-        
-    websocket_url = os.environ.get("TWILIO_WEBSOCKET_URL", "wss://insightia-production.up.railway.app/stt")
-    
-    twiml_parts = [
-        "<?xml version='1.0' encoding='UTF-8'?>",
-        "<Response>",
-        "  <Start>",
-        f"    <Stream url='{websocket_url}' />",
-        "  </Start>"
-    ]
-
-    if greeting_audio_url:
-        twiml_parts.append(f"  <Play>{greeting_audio_url}</Play>")
-    else:
-        twiml_parts.append(f"  <Say>{initial_greeting_text}</Say>")
-
-    # --- NUEVA ADICIÓN: <Gather> para mantener la llamada activa y esperar la voz del usuario ---
-    # input='speech': Twilio escuchará la voz.
-    # speechTimeout='auto': Twilio detectará automáticamente cuándo el usuario deja de hablar.
-    # timeout='10': Twilio esperará hasta 10 segundos de silencio antes de finalizar la espera (si no hay speech).
-    # action: URL a la que Twilio enviará el resultado de la voz del usuario.
-    #         Si no se especifica, Twilio volverá a enviar la solicitud a la URL actual (/voice).
-    #         Para un flujo de conversación completo, necesitarías un endpoint dedicado para esto.
-    
-    '''
-        twiml_parts.append(
-        "  <Gather input='speech' speechTimeout='auto' timeout='20'>"
-        "  </Gather>"
-        "</Response>"
-    )
-    '''
-    # Mantener la llamada abierta mientras se transmite el audio
-    # Se elimina el bloque <Gather> y se usa un <Pause> para mantener la conexion
-    twiml_parts.append("  <Pause length='20'/>")
-    twiml_parts.append("</Response>")
-
-
-
-    
-    twiml = "".join(twiml_parts)
-    print(f"Generated TwiML: {twiml}") # Para depuración
-    return Response(content=twiml, media_type="text/xml")
\ No newline at end of file
+    return None
+
+
+def _remember_greeting_url(task: asyncio.Task) -> None:
+    global _greeting_audio_url
+    if not task.cancelled() and task.exception() is None:
+        _greeting_audio_url = task.result()
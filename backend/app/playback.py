@@ -0,0 +1,191 @@
+# backend/app/playback.py
+import asyncio
+import audioop
+import base64
+import json
+import os
+import time
+from typing import AsyncIterator
+
+from . import tts
+
+# Twilio Media Streams solo acepta μ-law mono a 8 kHz en el canal de salida.
+OUT_SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = OUT_SAMPLE_RATE * FRAME_MS // 1000  # 160 bytes (1 byte por muestra)
+TTS_PCM_RATE = 24000  # response_format=pcm de OpenAI
+
+# Tramas enviadas por delante del tiempo real para absorber jitter de red.
+PREBUFFER_FRAMES = int(os.getenv("PLAYBACK_PREBUFFER_FRAMES", "5"))
+
+VAD_RMS_THRESHOLD = int(os.getenv("VAD_RMS_THRESHOLD", "700"))
+VAD_MIN_FRAMES = int(os.getenv("VAD_MIN_FRAMES", "3"))
+
+MULAW_SILENCE = b"\xff"
+
+
+class MulawEncoder:
+    """
+    Convierte PCM 16-bit mono a μ-law a 8 kHz por trozos, tal como llegan
+    del TTS: conserva el estado del resampler y el byte suelto de una
+    muestra partida entre dos trozos.
+    """
+
+    def __init__(self, rate: int = TTS_PCM_RATE) -> None:
+        self.rate = rate
+        self._state = None
+        self._odd = b""
+
+    def encode(self, pcm: bytes) -> bytes:
+        if self._odd:
+            pcm = self._odd + pcm
+        cut = len(pcm) - len(pcm) % 2
+        pcm, self._odd = pcm[:cut], pcm[cut:]
+        if self.rate != OUT_SAMPLE_RATE:
+            pcm, self._state = audioop.ratecv(
+                pcm, 2, 1, self.rate, OUT_SAMPLE_RATE, self._state
+            )
+        return audioop.lin2ulaw(pcm, 2)
+
+
+def pcm_to_mulaw(pcm: bytes, rate: int = TTS_PCM_RATE) -> bytes:
+    """Convierte PCM 16-bit mono a μ-law a 8 kHz."""
+    return MulawEncoder(rate).encode(pcm)
+
+
+def split_frames(mulaw: bytes) -> list[bytes]:
+    """Divide audio μ-law en tramas de 20 ms, rellenando la última con silencio."""
+    frames = [mulaw[i : i + FRAME_BYTES] for i in range(0, len(mulaw), FRAME_BYTES)]
+    if frames and len(frames[-1]) < FRAME_BYTES:
+        frames[-1] += MULAW_SILENCE * (FRAME_BYTES - len(frames[-1]))
+    return frames
+
+
+class VoiceActivityDetector:
+    """Detector de voz por energía sobre tramas μ-law entrantes."""
+
+    def __init__(
+        self, threshold: int = VAD_RMS_THRESHOLD, min_frames: int = VAD_MIN_FRAMES
+    ) -> None:
+        self.threshold = threshold
+        self.min_frames = min_frames
+        self._run = 0
+
+    def feed(self, mulaw: bytes) -> bool:
+        """Devuelve True mientras haya al menos `min_frames` tramas seguidas con voz."""
+        rms = audioop.rms(audioop.ulaw2lin(mulaw, 2), 2)
+        self._run = self._run + 1 if rms >= self.threshold else 0
+        return self._run >= self.min_frames
+
+
+class AudioPlayer:
+    """
+    Canal de salida de audio sobre el WebSocket de Twilio Media Streams.
+
+    Envía tramas `media` a ritmo de tiempo real, cierra cada locución con un
+    `mark` y permite cortar la reproducción con `clear` (barge-in).
+    """
+
+    def __init__(self, ws, stream_sid: str) -> None:
+        self.ws = ws
+        self.stream_sid = stream_sid
+        self.pending_marks: set[str] = set()
+        self._task: asyncio.Task | None = None
+        self._mark_seq = 0
+
+    @property
+    def playing(self) -> bool:
+        """True si quedan tramas por enviar o Twilio aún no confirmó el último mark."""
+        return (self._task is not None and not self._task.done()) or bool(
+            self.pending_marks
+        )
+
+    def say(self, text: str) -> asyncio.Task:
+        """Sintetiza `text` y lo reproduce; reemplaza cualquier locución en curso."""
+        return self._start(self._say(text))
+
+    def play(self, mulaw: bytes) -> asyncio.Task:
+        """Reproduce audio μ-law a 8 kHz; reemplaza cualquier locución en curso."""
+        return self._start(self._send_frames(_iterate(split_frames(mulaw))))
+
+    def on_mark(self, name: str) -> None:
+        """Twilio devuelve el mark cuando terminó de reproducir el audio previo."""
+        self.pending_marks.discard(name)
+
+    async def clear(self) -> None:
+        """Interrumpe la reproducción y vacía el búfer de audio de Twilio."""
+        await self._cancel()
+        self.pending_marks.clear()
+        await self._send({"event": "clear", "streamSid": self.stream_sid})
+
+    async def close(self) -> None:
+        await self._cancel()
+
+    def _start(self, coro) -> asyncio.Task:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = asyncio.create_task(coro)
+        return self._task
+
+    async def _cancel(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _say(self, text: str) -> None:
+        try:
+            await self._send_frames(self._tts_frames(text))
+        except Exception as e:
+            print(f"[{self.stream_sid}] Error generating TTS audio for playback: {e}")
+
+    async def _tts_frames(self, text: str) -> AsyncIterator[bytes]:
+        """Tramas de 20 ms según llega el audio del TTS, sin esperar al final."""
+        encoder = MulawEncoder()
+        pending = bytearray()
+        async for pcm in tts.stream_pcm(text):
+            pending += encoder.encode(pcm)
+            while len(pending) >= FRAME_BYTES:
+                yield bytes(pending[:FRAME_BYTES])
+                del pending[:FRAME_BYTES]
+        if pending:
+            yield bytes(pending) + MULAW_SILENCE * (FRAME_BYTES - len(pending))
+
+    async def _send_frames(self, frames: AsyncIterator[bytes]) -> None:
+        frame_seconds = FRAME_MS / 1000
+        start = None
+        i = 0
+        async for frame in frames:
+            if start is None:
+                # El reloj arranca con la primera trama, no con la petición.
+                start = time.monotonic()
+            delay = start + (i - PREBUFFER_FRAMES) * frame_seconds - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._send(
+                {
+                    "event": "media",
+                    "streamSid": self.stream_sid,
+                    "media": {"payload": base64.b64encode(frame).decode()},
+                }
+            )
+            i += 1
+        if start is None:
+            return  # Nada que reproducir
+        self._mark_seq += 1
+        name = f"utterance-{self._mark_seq}"
+        self.pending_marks.add(name)
+        await self._send(
+            {"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}
+        )
+
+    async def _send(self, message: dict) -> None:
+        await self.ws.send_text(json.dumps(message, separators=(",", ":")))
+
+
+async def _iterate(frames: list[bytes]) -> AsyncIterator[bytes]:
+    for frame in frames:
+        yield frame
@@ -0,0 +1,181 @@
+# backend/app/recorder.py
+import asyncio
+import os
+import tempfile
+import time
+import zlib
+
+from . import tts
+
+# Grabación de llamadas desactivada por defecto.
+RECORDING_ENABLED = os.getenv("CALL_RECORDING", "0") == "1"
+RECORDING_BUCKET = os.getenv("RECORDING_BUCKET", tts.R2_BUCKET_NAME)
+RECORDING_PREFIX = "recordings/"
+# S3/R2 exige partes de al menos 5 MiB salvo la última.
+PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("RECORDING_PART_BYTES", "0")))
+# Partes comprimidas pendientes de subir antes de abandonar la grabación.
+MAX_PENDING_PARTS = int(os.getenv("RECORDING_MAX_PENDING_PARTS", "2"))
+# Cada parte se acumula en un fichero temporal; solo esto queda en memoria.
+SPOOL_MEMORY_BYTES = int(os.getenv("RECORDING_SPOOL_BYTES", str(256 * 1024)))
+
+# Referencias a las subidas en curso para que el GC no las cancele.
+_uploads: set[asyncio.Task] = set()
+
+
+def _in_memory(size: int) -> int:
+    """Bytes en memoria de una parte de `size` bytes (el resto está en disco)."""
+    return size if size <= SPOOL_MEMORY_BYTES else 0
+
+
+class CallRecorder:
+    """
+    Grabación en streaming de una llamada: comprime las tramas μ-law con gzip
+    a medida que llegan y sube partes fijas a R2 con multipart upload en
+    segundo plano.
+
+    Las partes se escriben en un fichero temporal que pasa a disco al superar
+    SPOOL_MEMORY_BYTES, así que una llamada ocupa como mucho eso en memoria
+    aunque las partes sean de 5 MiB. `write` nunca espera: si R2 no da abasto
+    y se acumulan más de MAX_PENDING_PARTS partes, la grabación se abandona
+    para acotar también el disco.
+    """
+
+    def __init__(self, call_id: str, bucket: str = RECORDING_BUCKET) -> None:
+        self.call_id = call_id
+        self.bucket = bucket
+        self.key = f"{RECORDING_PREFIX}{call_id}-{int(time.time())}.ulaw.gz"
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.failed = False
+        # wbits=31: formato gzip
+        self._compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+        self._part = self._new_part()
+        self._part_size = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending_parts = 0
+        self.task = asyncio.create_task(self._upload_loop())
+        _uploads.add(self.task)
+        self.task.add_done_callback(_uploads.discard)
+
+    @staticmethod
+    def _new_part():
+        return tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+
+    def buffered_bytes(self) -> int:
+        """Memoria ocupada por la parte en curso y las pendientes de subir."""
+        pending = self._pending_parts * _in_memory(PART_SIZE)
+        return _in_memory(self._part_size) + pending
+
+    def write(self, frame: bytes) -> None:
+        if self.failed:
+            return
+        self.bytes_in += len(frame)
+        self._append(self._compressor.compress(frame))
+        if self._part_size >= PART_SIZE:
+            self._enqueue()
+
+    def close(self) -> None:
+        """Cierra el flujo gzip y encola la última parte; la subida sigue sola."""
+        if not self.failed:
+            self._append(self._compressor.flush())
+            self._enqueue()
+        else:
+            self._part.close()
+        self._queue.put_nowait(None)
+
+    def _append(self, data: bytes) -> None:
+        if data:
+            self._part.write(data)
+            self._part_size += len(data)
+
+    def _enqueue(self) -> None:
+        part, size = self._part, self._part_size
+        self._part, self._part_size = self._new_part(), 0
+        if self._pending_parts >= MAX_PENDING_PARTS:
+            print(f"[{self.call_id}] Recording upload backlog full, abandoning it.")
+            self.failed = True
+            part.close()
+            return
+        part.seek(0)
+        self._pending_parts += 1
+        self._queue.put_nowait((part, size))
+
+    async def _upload_loop(self) -> None:
+        upload_id = None
+        parts = []
+        client = None
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                self._pending_parts -= 1
+                part, size = item
+                if self.failed:
+                    part.close()
+                    continue
+                if upload_id is None:
+                    client = await asyncio.to_thread(tts.get_s3_client)
+                    if client is None:
+                        raise RuntimeError(
+                            "S3 client not initialized. Cannot record to R2."
+                        )
+                    resp = await asyncio.to_thread(
+                        client.create_multipart_upload,
+                        Bucket=self.bucket,
+                        Key=self.key,
+                        ContentType="application/gzip",
+                    )
+                    upload_id = resp["UploadId"]
+                number = len(parts) + 1
+                try:
+                    # boto3 lee el cuerpo desde el fichero, sin cargarlo entero.
+                    resp = await asyncio.to_thread(
+                        client.upload_part,
+                        Bucket=self.bucket,
+                        Key=self.key,
+                        PartNumber=number,
+                        UploadId=upload_id,
+                        Body=part,
+                        ContentLength=size,
+                    )
+                finally:
+                    part.close()
+                parts.append({"ETag": resp["ETag"], "PartNumber": number})
+                self.bytes_out += size
+
+            if upload_id is None:
+                return
+            if self.failed:
+                raise RuntimeError("recording abandoned")
+            await asyncio.to_thread(
+                client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            print(
+                f"[{self.call_id}] Recording uploaded to R2: {self.key} "
+                f"({self.bytes_out} bytes)"
+            )
+        except Exception as e:
+            self.failed = True
+            print(f"[{self.call_id}] Error uploading recording {self.key}: {e}")
+            if upload_id is not None:
+                try:
+                    await asyncio.to_thread(
+                        client.abort_multipart_upload,
+                        Bucket=self.bucket,
+                        Key=self.key,
+                        UploadId=upload_id,
+                    )
+                except Exception as abort_error:
+                    print(f"[{self.call_id}] Error aborting upload: {abort_error}")
+
+
+def start(call_id: str) -> CallRecorder | None:
+    """Crea el grabador de la llamada si la grabación está activada."""
+    if not RECORDING_ENABLED:
+        return None
+    return CallRecorder(call_id)
@@ -0,0 +1,149 @@
+# backend/app/sessions.py
+import asyncio
+import os
+import sys
+import time
+
+# Sin mensajes de Twilio durante este tiempo, la llamada se vacía y se cierra.
+IDLE_TIMEOUT_SECONDS = float(os.getenv("STT_IDLE_TIMEOUT_SECONDS", "30"))
+# Red de seguridad: corrutinas sin actividad tras este tiempo se cancelan.
+REAP_AFTER_SECONDS = float(
+    os.getenv("STT_REAP_AFTER_SECONDS", str(IDLE_TIMEOUT_SECONDS * 2))
+)
+REAP_INTERVAL = 5.0
+
+
+class CallSession:
+    """Estado compacto de una llamada activa en /stt."""
+
+    __slots__ = (
+        "call_id",
+        "stream_sid",
+        "buffer",
+        "bytes_in",
+        "frames_in",
+        "chunk_seq",
+        "started_at",
+        "ts_start",
+        "last_activity",
+        "task",
+        "recorder",
+        "chunker",
+        "pending",
+        "pending_bytes",
+        "transcriber",
+    )
+
+    def __init__(self, call_id: str, stream_sid: str | None = None) -> None:
+        now = time.time()
+        self.call_id = call_id
+        self.stream_sid = stream_sid
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.frames_in = 0
+        self.chunk_seq = 0
+        self.started_at = now
+        self.ts_start = now
+        self.last_activity = time.monotonic()
+        self.task: asyncio.Task | None = None
+        self.recorder = None
+        self.chunker = None
+        # Bloques (audio, ts_start, ts_end, final) a la espera de Whisper.
+        self.pending: asyncio.Queue = asyncio.Queue()
+        self.pending_bytes = 0
+        self.transcriber: asyncio.Task | None = None
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_activity
+
+    def footprint(self) -> int:
+        """Bytes aproximados que ocupa la sesión, incluido el búfer de audio."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.buffer) + self.pending_bytes
+        if self.recorder is not None:
+            size += self.recorder.buffered_bytes()
+        return size
+
+    def snapshot(self) -> dict:
+        return {
+            "call_id": self.call_id,
+            "stream_sid": self.stream_sid,
+            "bytes_in": self.bytes_in,
+            "frames_in": self.frames_in,
+            "chunk_seq": self.chunk_seq,
+            "chunk_seconds": round(self.chunker.seconds, 3) if self.chunker else None,
+            "buffered_bytes": len(self.buffer),
+            "pending_bytes": self.pending_bytes,
+            "started_at": self.started_at,
+            "idle_seconds": round(self.idle_seconds(), 3),
+            "memory_bytes": self.footprint(),
+        }
+
+
+class SessionRegistry:
+    """Registro de las llamadas activas del worker."""
+
+    def __init__(self) -> None:
+        self._sessions: dict[int, CallSession] = {}
+        self._reaper: asyncio.Task | None = None
+        self.reaped = 0
+
+    def open(self, call_id: str, stream_sid: str | None = None) -> CallSession:
+        session = CallSession(call_id, stream_sid)
+        try:
+            session.task = asyncio.current_task()
+        except RuntimeError:
+            session.task = None
+        self._sessions[id(session)] = session
+        self.ensure_reaper()
+        return session
+
+    def close(self, session: CallSession) -> None:
+        self._sessions.pop(id(session), None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def sessions(self) -> list[CallSession]:
+        return list(self._sessions.values())
+
+    def snapshot(self) -> dict:
+        calls = [s.snapshot() for s in self._sessions.values()]
+        return {
+            "active": len(calls),
+            "reaped": self.reaped,
+            "memory_bytes": sum(c["memory_bytes"] for c in calls),
+            "calls": calls,
+        }
+
+    def reap(self, max_idle: float = REAP_AFTER_SECONDS) -> list[CallSession]:
+        """Cancela las llamadas colgadas más allá de `max_idle` segundos."""
+        stale = [s for s in self._sessions.values() if s.idle_seconds() > max_idle]
+        for session in stale:
+            idle = session.idle_seconds()
+            print(f"[{session.call_id}] Reaping stream idle for {idle:.1f}s.")
+            if session.task is not None and not session.task.done():
+                session.task.cancel()
+            self.close(session)
+        self.reaped += len(stale)
+        return stale
+
+    def ensure_reaper(self) -> None:
+        """Arranca la tarea de limpieza periódica en el loop actual."""
+        if self._reaper is not None and not self._reaper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._reaper = loop.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            self.reap()
+
+
+registry = SessionRegistry()
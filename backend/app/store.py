@@ -0,0 +1,343 @@
+# backend/app/store.py
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from . import supabase
+
+# Copia local de las transcripciones; Supabase se sincroniza en segundo plano.
+DB_PATH = os.getenv(
+    "TRANSCRIPT_DB_PATH",
+    os.path.join(tempfile.gettempdir(), "insightia-transcripts.db"),
+)
+SYNC_INTERVAL = float(os.getenv("TRANSCRIPT_SYNC_INTERVAL", "2"))
+# Tras este número de fallos la fila queda apartada (synced = DEAD).
+SYNC_MAX_ATTEMPTS = int(os.getenv("TRANSCRIPT_SYNC_MAX_ATTEMPTS", "8"))
+# Las filas ya replicadas en Supabase se borran del disco local pasado este tiempo.
+RETENTION_SECONDS = float(os.getenv("TRANSCRIPT_RETENTION_HOURS", "168")) * 3600
+SYNC_BATCH = 100
+MAX_PAGE_SIZE = 500
+# Si un worker muere con filas reclamadas, otro las retoma pasado este tiempo.
+CLAIM_TIMEOUT_SECONDS = 60.0
+MAX_BACKOFF_SECONDS = 300.0
+PRUNE_INTERVAL = 300.0
+
+# Estados de la columna `synced`.
+PENDING, SYNCED, CLAIMED, DEAD = 0, 1, 2, 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    call_id TEXT NOT NULL,
+    ts_start REAL NOT NULL,
+    ts_end REAL NOT NULL,
+    text TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_call ON transcripts (call_id, ts_start);
+DROP INDEX IF EXISTS idx_transcripts_unsynced;
+"""
+
+# Columnas añadidas después; se migran en bases de datos existentes.
+_MIGRATIONS = {
+    "attempts": "ALTER TABLE transcripts ADD attempts INTEGER NOT NULL DEFAULT 0",
+    "retry_at": "ALTER TABLE transcripts ADD retry_at REAL NOT NULL DEFAULT 0",
+}
+
+_PENDING_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_transcripts_pending
+    ON transcripts (id) WHERE synced IN (0, 2);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts
+    USING fts5(text, content='transcripts', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS transcripts_fts_insert AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_fts_delete AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcripts_fts (transcripts_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_COLUMNS = "id, call_id, ts_start, ts_end, text"
+
+# Reclama filas de forma atómica: dos workers sobre el mismo fichero nunca
+# se llevan la misma fila.
+_CLAIM = f"""
+UPDATE transcripts SET synced = {CLAIMED}, retry_at = ?
+WHERE id IN (
+    SELECT id FROM transcripts
+    WHERE synced IN ({PENDING}, {CLAIMED}) AND retry_at <= ?
+    ORDER BY id LIMIT ?
+)
+RETURNING {_COLUMNS}
+"""
+
+
+def _row(row: tuple) -> dict:
+    return {
+        "id": row[0],
+        "call_id": row[1],
+        "ts_start": row[2],
+        "ts_end": row[3],
+        "text": row[4],
+    }
+
+
+def _fts_query(query: str) -> str:
+    """Cita cada término para que la entrada no se interprete como sintaxis FTS5."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class TranscriptStore:
+    """
+    Almacén local de transcripciones en SQLite (WAL) con búsqueda FTS5.
+
+    La conexión se abre en el primer uso; las escrituras son locales y un
+    sincronizador en segundo plano las replica en Supabase.
+    """
+
+    def __init__(self, path: str = DB_PATH) -> None:
+        self.path = path
+        self.fts = False
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._pending: asyncio.Event | None = None
+        self._syncer: asyncio.Task | None = None
+        self._pruned_at = 0.0
+        self.fallbacks = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(transcripts)")}
+            for column, ddl in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(ddl)
+            conn.executescript(_PENDING_INDEX)
+            try:
+                conn.executescript(_FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:  # pragma: no cover - sin FTS5
+                print(f"FTS5 not available, transcript search falls back to LIKE: {e}")
+            self._conn = conn
+        return self._conn
+
+    def add(self, call_id: str, ts_start: float, ts_end: float, text: str) -> int:
+        """Guarda una transcripción y avisa al sincronizador."""
+        with self._lock:
+            cur = self._db().execute(
+                "INSERT INTO transcripts (call_id, ts_start, ts_end, text) "
+                "VALUES (?, ?, ?, ?)",
+                (call_id, ts_start, ts_end, text),
+            )
+        self._notify()
+        return cur.lastrowid
+
+    async def save(self, call_id: str, ts_start: float, ts_end: float, text: str):
+        """
+        Versión para el loop de `add`: escribe en un hilo y, si SQLite falla
+        (disco lleno, base bloqueada), envía la fila directamente a Supabase.
+        """
+        try:
+            await asyncio.to_thread(self.add, call_id, ts_start, ts_end, text)
+        except sqlite3.Error as e:
+            self.fallbacks += 1
+            print(f"[{call_id}] Local transcript store failed, saving remotely: {e}")
+            await supabase.save_transcript(call_id, ts_start, ts_end, text)
+            return
+        self._notify()
+
+    def transcript(self, call_id: str, offset: int = 0, limit: int = 50) -> list[dict]:
+        limit = max(0, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    f"SELECT {_COLUMNS} FROM transcripts WHERE call_id = ? "
+                    "ORDER BY ts_start LIMIT ? OFFSET ?",
+                    (call_id, limit, max(0, offset)),
+                )
+                .fetchall()
+            )
+        return [_row(r) for r in rows]
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        limit = max(0, min(limit, MAX_PAGE_SIZE))
+        if not query.strip():
+            return []
+        with self._lock:
+            db = self._db()
+            if self.fts:
+                columns = ", ".join("t." + c for c in _COLUMNS.split(", "))
+                rows = db.execute(
+                    f"SELECT {columns} FROM transcripts_fts "
+                    "JOIN transcripts t ON t.id = transcripts_fts.rowid "
+                    "WHERE transcripts_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (_fts_query(query), limit),
+                ).fetchall()
+            else:  # pragma: no cover - SQLite sin FTS5
+                rows = db.execute(
+                    f"SELECT {_COLUMNS} FROM transcripts WHERE text LIKE ? "
+                    "ORDER BY ts_start DESC LIMIT ?",
+                    (f"%{query}%", limit),
+                ).fetchall()
+        return [_row(r) for r in rows]
+
+    def unsynced(self) -> int:
+        """Filas aún no replicadas, incluidas las que esperan reintento."""
+        with self._lock:
+            (count,) = (
+                self._db()
+                .execute(
+                    "SELECT count(*) FROM transcripts WHERE synced IN (?, ?)",
+                    (PENDING, CLAIMED),
+                )
+                .fetchone()
+            )
+        return count
+
+    def dead(self) -> list[dict]:
+        """Filas apartadas tras agotar SYNC_MAX_ATTEMPTS intentos."""
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    f"SELECT {_COLUMNS} FROM transcripts WHERE synced = ? ORDER BY id",
+                    (DEAD,),
+                )
+                .fetchall()
+            )
+        return [_row(r) for r in rows]
+
+    def claim(self, limit: int = SYNC_BATCH) -> list[dict]:
+        """Reserva hasta `limit` filas pendientes para este worker."""
+        now = time.time()
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(_CLAIM, (now + CLAIM_TIMEOUT_SECONDS, now, limit))
+                .fetchall()
+            )
+        return sorted((_row(r) for r in rows), key=lambda r: r["id"])
+
+    def mark_synced(self, ids: list[int]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            self._db().executemany(
+                "UPDATE transcripts SET synced = ? WHERE id = ?",
+                [(SYNCED, i) for i in ids],
+            )
+
+    def mark_failed(self, row_id: int) -> None:
+        """Reintento con backoff exponencial; tras SYNC_MAX_ATTEMPTS, DEAD."""
+        with self._lock:
+            db = self._db()
+            (attempts,) = db.execute(
+                "UPDATE transcripts SET attempts = attempts + 1 WHERE id = ? "
+                "RETURNING attempts",
+                (row_id,),
+            ).fetchone()
+            if attempts >= SYNC_MAX_ATTEMPTS:
+                print(f"Transcript {row_id} failed {attempts} syncs, giving up.")
+                db.execute(
+                    "UPDATE transcripts SET synced = ? WHERE id = ?", (DEAD, row_id)
+                )
+                return
+            backoff = min(SYNC_INTERVAL * 2**attempts, MAX_BACKOFF_SECONDS)
+            db.execute(
+                "UPDATE transcripts SET synced = ?, retry_at = ? WHERE id = ?",
+                (PENDING, time.time() + backoff, row_id),
+            )
+
+    def release(self, ids: list[int]) -> None:
+        """Devuelve filas reclamadas sin intentar, sin contar un fallo."""
+        if not ids:
+            return
+        with self._lock:
+            self._db().executemany(
+                "UPDATE transcripts SET synced = ?, retry_at = 0 WHERE id = ?",
+                [(PENDING, i) for i in ids],
+            )
+
+    def prune(self, now: float | None = None) -> int:
+        """Borra las filas ya replicadas más antiguas que RETENTION_SECONDS."""
+        cutoff = (time.time() if now is None else now) - RETENTION_SECONDS
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM transcripts WHERE synced = ? AND ts_end < ?",
+                (SYNCED, cutoff),
+            )
+        return cur.rowcount
+
+    async def sync_once(self) -> int:
+        """Replica en Supabase las filas pendientes; devuelve cuántas subió."""
+        if not supabase.configured():
+            return 0
+        rows = await asyncio.to_thread(self.claim)
+        synced = []
+        for i, row in enumerate(rows):
+            ok = await supabase.save_transcript(
+                row["call_id"], row["ts_start"], row["ts_end"], row["text"]
+            )
+            if not ok:
+                # Supabase falla: esta fila espera su backoff y el resto vuelve
+                # a la cola para la próxima pasada.
+                await asyncio.to_thread(self.mark_failed, row["id"])
+                await asyncio.to_thread(self.release, [r["id"] for r in rows[i + 1 :]])
+                break
+            synced.append(row["id"])
+        await asyncio.to_thread(self.mark_synced, synced)
+        return len(synced)
+
+    def ensure_syncer(self) -> None:
+        """Arranca el sincronizador; recoge también filas de un proceso anterior."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._syncer is None or self._syncer.done():
+            self._pending = asyncio.Event()
+            self._pending.set()  # Primera pasada inmediata
+            self._syncer = loop.create_task(self._sync_loop(self._pending))
+
+    def _notify(self) -> None:
+        self.ensure_syncer()
+        if self._pending is not None:
+            self._pending.set()
+
+    async def _sync_loop(self, pending: asyncio.Event) -> None:
+        try:
+            while True:
+                try:
+                    # asyncio.timeout, no wait_for: en 3.11 wait_for puede
+                    # tragarse la cancelación si el evento llega a la vez.
+                    async with asyncio.timeout(SYNC_INTERVAL):
+                        await pending.wait()
+                except TimeoutError:
+                    pass
+                pending.clear()
+                try:
+                    while await self.sync_once() == SYNC_BATCH:
+                        pass
+                    if time.time() - self._pruned_at > PRUNE_INTERVAL:
+                        self._pruned_at = time.time()
+                        await asyncio.to_thread(self.prune)
+                except Exception as e:
+                    print(f"Error syncing transcripts to Supabase: {e}")
+        except asyncio.CancelledError:
+            return
+
+
+store = TranscriptStore()
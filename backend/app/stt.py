@@ -1,4 +1,5 @@
 # backend/app/stt.py
+import asyncio
 import audioop
 import io
 import os
@@ -6,16 +7,21 @@ import time
 import wave
 import httpx
 import json
-import base64
 from fastapi import WebSocket # Necesario para tipado y métodos asíncronos
 
-from .supabase import save_transcript
+from . import admission, chunking, frames, hedge, recorder, sessions, store
+from . import transcript_cache
+from .playback import AudioPlayer, VoiceActivityDetector
+from .sessions import CallSession
 
 SAMPLE_RATE = int(os.getenv("TWILIO_SAMPLE_RATE", "16000"))
 
-CHUNK_SECONDS = 5
+CHUNK_SECONDS = 5  # Duración inicial; luego la ajusta el ChunkController
 CHUNK_SIZE = SAMPLE_RATE * CHUNK_SECONDS  # bytes for mu-law (1 byte per sample)
 
+# Controlador compartido por todas las llamadas del worker.
+worker_chunks = chunking.ChunkController(CHUNK_SECONDS)
+
 
 def mulaw_to_wav(data: bytes) -> bytes:
     """Convierte audio μ-law en un archivo WAV."""
@@ -30,97 +36,227 @@ def mulaw_to_wav(data: bytes) -> bytes:
     return buffer.getvalue()
 
 
-def transcribe_chunk(wav: bytes) -> str:
-    """Envía audio a Whisper y devuelve el texto."""
+async def transcribe_chunk(wav: bytes) -> str:
+    """Envía audio a Whisper y devuelve el texto.
+
+    Los errores de red o de API se propagan: un "" significaría "no se dijo
+    nada" y acabaría en la caché de transcripciones. Es una corrutina para
+    que cancelarla (deadline, petición duplicada perdedora) corte la petición.
+    """
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set")
     headers = {"Authorization": f"Bearer {api_key}"}
     files = {"file": ("audio.wav", wav, "audio/wav")}
     data = {"model": "whisper-1", "language": "es"}
-    
+
     try:
-        resp = httpx.post(
-            "https://api.openai.com/v1/audio/transcriptions", headers=headers, data=data, files=files, timeout=5 # Añadir timeout
-        )
+        async with httpx.AsyncClient(timeout=5) as client:
+            resp = await client.post(
+                "https://api.openai.com/v1/audio/transcriptions",
+                headers=headers,
+                data=data,
+                files=files,
+            )
         resp.raise_for_status() # Lanza un HTTPStatusError para códigos de error 4xx/5xx
         return resp.json().get("text", "")
     except httpx.RequestError as e:
         print(f"An error occurred while requesting Whisper API: {e}")
-        return "" # Devuelve cadena vacía en caso de error de red/conexión
+        raise
     except httpx.HTTPStatusError as e:
-        print(f"Whisper API returned an error {e.response.status_code}: {e.response.text}")
-        return "" # Devuelve cadena vacía en caso de error de API
+        status = e.response.status_code
+        print(f"Whisper API returned an error {status}: {e.response.text}")
+        raise
+
+
+async def _transcribe_buffer(
+    ws: WebSocket,
+    session: CallSession,
+    raw: bytes,
+    ts_start: float,
+    ts_end: float,
+    final: bool = False,
+) -> None:
+    """Transcribe un bloque de audio, lo guarda y lo reenvía por el WebSocket."""
+    session.chunk_seq += 1
+    # Silencio y audio repetido se resuelven sin llamar a Whisper.
+    key, text = transcript_cache.cache.lookup(raw)
+    if text is None:
+        wav = mulaw_to_wav(raw)
+        started = time.monotonic()
+        # Con deadline y petición duplicada si Whisper va lento.
+        text = await hedge.requester.call(transcribe_chunk, wav)
+        # Backlog real: bloques que siguen en la cola esperando a Whisper.
+        session.chunker.observe(time.monotonic() - started, session.pending_bytes)
+        if text is not None:
+            # None = error o deadline: no se cachea para reintentar la próxima vez.
+            transcript_cache.cache.store(key, text)
+        text = text or ""
+
+    if text and text.strip():
+        # Local primero; Supabase se sincroniza en segundo plano.
+        await store.store.save(session.call_id, ts_start, ts_end, text)
+        if final:
+            print(f"[{session.call_id}] Transcribed (final chunk): {text}")
+        else:
+            print(f"[{session.call_id}] Transcribed: {text}")
+            if session.stream_sid is None:
+                # Con reproductor, el WebSocket es de Twilio y solo admite sus
+                # mensajes JSON: el texto plano cortaría el stream.
+                await ws.send_text(text)
+
+
+async def _transcribe_loop(ws: WebSocket, session: CallSession) -> None:
+    """Consume los bloques pendientes de la llamada, uno a uno, fuera del receive."""
+    while True:
+        item = await session.pending.get()
+        if item is None:
+            return
+        raw, ts_start, ts_end, final = item
+        session.pending_bytes -= len(raw)
+        try:
+            await _transcribe_buffer(ws, session, raw, ts_start, ts_end, final)
+        except Exception as e:
+            print(f"[{session.call_id}] Error transcribing chunk: {e}")
+
+
+def _enqueue(session: CallSession, raw: bytes, final: bool = False) -> None:
+    """
+    Encola un bloque para transcribir. Si el audio pendiente supera
+    MAX_BUFFER_BYTES se descartan los bloques más antiguos; el más reciente
+    siempre se conserva.
+    """
+    now = time.time()
+    item = (raw, session.ts_start, now, final)
+    session.ts_start = now
+    while (
+        session.pending_bytes + len(raw) > admission.MAX_BUFFER_BYTES
+        and not session.pending.empty()
+    ):
+        old = session.pending.get_nowait()
+        session.pending_bytes -= len(old[0])
+        admission.controller.shed(len(old[0]))
+        print(f"[{session.call_id}] Whisper backlog full, dropped {len(old[0])} bytes.")
+    session.pending.put_nowait(item)
+    session.pending_bytes += len(raw)
+
+
+async def _finish(session: CallSession) -> None:
+    """Encola el audio restante y espera a que se transcriba todo lo pendiente."""
+    if session.buffer:
+        print(
+            f"[{session.call_id}] Processing remaining buffer "
+            f"({len(session.buffer)} bytes) before stopping."
+        )
+        _enqueue(session, bytes(session.buffer), final=True)
+        session.buffer.clear()
+    session.pending.put_nowait(None)
+    await session.transcriber
 
 
-async def process_stream(ws: WebSocket, call_id: str) -> None:
+async def _on_media(
+    session: CallSession,
+    payload_b64: str,
+    vad: VoiceActivityDetector,
+    player: AudioPlayer | None,
+) -> None:
+    """Añade una trama al búfer de la llamada y encola cada bloque completo."""
+    frame = frames.decode_into(session.buffer, payload_b64)
+    if session.recorder is not None:
+        session.recorder.write(frame)
+    session.bytes_in += len(frame)
+    session.frames_in += 1
+
+    if player and vad.feed(frame) and player.playing:
+        print(f"[{session.call_id}] Caller speech detected, clearing playback.")
+        await player.clear()
+
+    chunk_size = session.chunker.chunk_bytes()
+    while len(session.buffer) >= chunk_size:
+        _enqueue(session, bytes(session.buffer[:chunk_size]))
+        del session.buffer[:chunk_size]
+
+
+async def process_stream(
+    ws: WebSocket, call_id: str, player: AudioPlayer | None = None
+) -> None:
     """
     Procesa audio por WebSocket, lo envía a Whisper y emite transcripciones.
     Maneja diferentes tipos de mensajes de Twilio Media Streams.
+    Si se pasa `player`, la voz entrante interrumpe su reproducción (barge-in).
+    Si Twilio deja de enviar mensajes durante IDLE_TIMEOUT_SECONDS, la llamada
+    se vacía y se cierra aunque nunca llegue el evento 'stop'.
     """
-    buffer = b""
-    ts_start = time.time()
-    
+    session = sessions.registry.open(call_id, player.stream_sid if player else None)
+    session.recorder = recorder.start(call_id)
+    session.chunker = chunking.CallChunker(worker_chunks, SAMPLE_RATE, CHUNK_SECONDS)
+    session.transcriber = asyncio.create_task(_transcribe_loop(ws, session))
+    vad = VoiceActivityDetector()
+
     print(f"[{call_id}] Starting STT stream processing.")
 
     stream_active = True # Controla el bucle principal
     try:
-        while stream_active: 
-            message = await ws.receive()  # Espera por cualquier tipo de mensaje
+        while stream_active:
+            try:
+                # Espera por cualquier tipo de mensaje
+                idle_timeout = sessions.IDLE_TIMEOUT_SECONDS
+                message = await asyncio.wait_for(ws.receive(), idle_timeout)
+            except asyncio.TimeoutError:
+                print(f"[{call_id}] No messages for {idle_timeout}s, closing stream.")
+                await _finish(session)
+                await ws.close()
+                break
+            session.touch()
 
-            if "text" in message:
+            if message is None or message.get("type") == "websocket.disconnect":
+                # La conexión WebSocket se cerró inesperadamente por el cliente
+                print(f"[{call_id}] WebSocket closed by client unexpectedly.")
+                await _finish(session)
+                stream_active = False # Salir del bucle
+
+            elif "text" in message:
                 # Twilio Media Streams envía todos los datos como texto JSON
                 try:
-                    control_data = json.loads(message["text"])
+                    payload_b64 = frames.media_payload(message["text"])
+                    if payload_b64 is not None:
+                        # Camino rápido: ~50 tramas por segundo y llamada
+                        await _on_media(session, payload_b64, vad, player)
+                        continue
+
+                    control_data = frames.loads(message["text"])
                     event = control_data.get("event")
 
                     if event == "media":
                         payload_b64 = control_data.get("media", {}).get("payload", "")
                         if payload_b64:
-                            buffer += base64.b64decode(payload_b64)
-
-                            while len(buffer) >= CHUNK_SIZE:
-                                raw = buffer[:CHUNK_SIZE]
-                                buffer = buffer[CHUNK_SIZE:]
-
-                                wav = mulaw_to_wav(raw)
-                                text = transcribe_chunk(wav)
-                                ts_end = time.time()
-
-                                if text and text.strip():
-                                    await save_transcript(call_id, ts_start, ts_end, text)
-                                    print(f"[{call_id}] Transcribed: {text}")
-                                    await ws.send_text(text)
-
-                                ts_start = ts_end
+                            await _on_media(session, payload_b64, vad, player)
 
                     elif event == "stop":
                         print(f"[{call_id}] Twilio Media Stream 'stop' event received.")
-
-                        if buffer:
-                            print(
-                                f"[{call_id}] Processing remaining buffer ({len(buffer)} bytes) before stopping."
-                            )
-                            wav = mulaw_to_wav(buffer)
-                            text = transcribe_chunk(wav)
-                            ts_end = time.time()
-                            if text and text.strip():
-                                await save_transcript(call_id, ts_start, ts_end, text)
-                                print(f"[{call_id}] Transcribed (final chunk): {text}")
-
+                        await _finish(session)
                         stream_active = False
+                    elif event == "mark":
+                        if player:
+                            player.on_mark(control_data.get("mark", {}).get("name", ""))
                     else:
                         print(f"[{call_id}] Received control message: {event}")
 
                 except json.JSONDecodeError:
                     print(f"[{call_id}] Received non-JSON text message: {message['text']}")
-            
-            elif message is None: # La conexión WebSocket se cerró inesperadamente por el cliente
-                print(f"[{call_id}] WebSocket connection closed by client unexpectedly.")
-                stream_active = False # Salir del bucle
-                
+
     except Exception as e:
         print(f"[{call_id}] Error processing stream: {e}")
     finally:
-        print(f"[{call_id}] STT stream processing finished. Final buffer size: {len(buffer)}")
-        # El búfer ya fue procesado si se recibió un evento 'stop'.
\ No newline at end of file
+        if not session.transcriber.done():
+            session.transcriber.cancel()
+        sessions.registry.close(session)
+        if session.recorder is not None:
+            session.recorder.close()
+        if player:
+            await player.close()
+        print(
+            f"[{call_id}] STT stream processing finished. "
+            f"Final buffer size: {len(session.buffer)}"
+        )
+        # El búfer ya fue procesado si se recibió un evento 'stop'.
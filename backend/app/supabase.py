@@ -4,14 +4,22 @@ import os
 import httpx
 
 
-async def save_transcript(call_id: str, ts_start: float, ts_end: float, text: str) -> None:
-    """Save transcription data to Supabase if credentials exist."""
+def configured() -> bool:
+    """True if Supabase credentials are set."""
+    return bool(os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_KEY"))
+
+
+async def save_transcript(call_id: str, ts_start: float, ts_end: float, text: str) -> bool:
+    """Save transcription data to Supabase if credentials exist.
+
+    Returns True if the row was stored.
+    """
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_KEY")
     
     if not url or not key:
         print("Supabase credentials not set. Skipping save_transcript.")
-        return # Si las variables no están, la función sale sin error
+        return False # Si las variables no están, la función sale sin error
 
     headers = {
         "apikey": key,
@@ -32,9 +40,11 @@ async def save_transcript(call_id: str, ts_start: float, ts_end: float, text: st
         
         resp.raise_for_status() # Lanza un HTTPStatusError para códigos de error 4xx/5xx
         print(f"Transcript saved to Supabase for call {call_id}: {text[:50]}...") # Log de éxito
+        return True
     except httpx.RequestError as e:
         print(f"Supabase connection error for call {call_id}: {e}")
     except httpx.HTTPStatusError as e:
         print(f"Supabase API error {e.response.status_code} for call {call_id}: {e.response.text}")
     except Exception as e:
-        print(f"An unexpected error occurred while saving to Supabase for call {call_id}: {e}")
\ No newline at end of file
+        print(f"An unexpected error occurred while saving to Supabase for call {call_id}: {e}")
+    return False
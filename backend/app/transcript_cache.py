@@ -0,0 +1,106 @@
+# backend/app/transcript_cache.py
+import audioop
+import hashlib
+import os
+from collections import OrderedDict
+
+# Capacidad de la caché en bytes de texto y número de entradas.
+CACHE_MAX_BYTES = int(os.getenv("STT_CACHE_MAX_BYTES", str(1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("STT_CACHE_MAX_ENTRIES", "4096"))
+# RMS (PCM 16-bit) por debajo del cual un bloque se considera silencio.
+SILENCE_RMS_THRESHOLD = int(os.getenv("STT_SILENCE_RMS", "200"))
+# Ventana del detector de silencio: 20 ms de μ-law a 8 kHz, una trama de Twilio.
+SILENCE_WINDOW_BYTES = 160
+
+# Coste fijo aproximado de una entrada (clave de 16 bytes + nodo del dict).
+_ENTRY_OVERHEAD = 16 + 64
+
+
+def chunk_key(raw: bytes) -> bytes:
+    """Hash rápido del audio μ-law crudo."""
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def is_silence(raw: bytes, threshold: int = SILENCE_RMS_THRESHOLD) -> bool:
+    """
+    Silencio solo si ninguna ventana de 20 ms supera el umbral: un "sí" corto
+    dentro de un bloque largo se diluiría en el RMS del bloque entero.
+    """
+    pcm = audioop.ulaw2lin(raw, 2)
+    # Cota rápida: el RMS de una ventana nunca supera su pico.
+    if audioop.max(pcm, 2) < threshold:
+        return True
+    view = memoryview(pcm)
+    step = SILENCE_WINDOW_BYTES * 2  # PCM 16-bit
+    return all(
+        audioop.rms(view[i : i + step], 2) < threshold
+        for i in range(0, len(view), step)
+    )
+
+
+class TranscriptCache:
+    """
+    Caché LRU de transcripciones indexada por el hash del audio μ-law.
+
+    Evita enviar a Whisper bloques repetidos (música en espera, locuciones de
+    IVR) y los bloques de silencio.
+    """
+
+    def __init__(
+        self, max_bytes: int = CACHE_MAX_BYTES, max_entries: int = CACHE_MAX_ENTRIES
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.silence_skips = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, raw: bytes) -> tuple[bytes, str | None]:
+        """Devuelve (clave, texto); texto None si hay que llamar a Whisper."""
+        if is_silence(raw):
+            self.silence_skips += 1
+            return b"", ""
+        key = chunk_key(raw)
+        text = self._entries.get(key)
+        if text is None:
+            self.misses += 1
+            return key, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return key, text
+
+    def store(self, key: bytes, text: str) -> None:
+        if not key or key in self._entries:
+            return
+        cost = _ENTRY_OVERHEAD + len(text.encode())
+        if cost > self.max_bytes:
+            return
+        self._entries[key] = text
+        self.size_bytes += cost
+        while self.size_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            self.size_bytes -= _ENTRY_OVERHEAD + len(old.encode())
+            self.evictions += 1
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses + self.silence_skips
+        saved = self.hits + self.silence_skips
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "silence_skips": self.silence_skips,
+            "evictions": self.evictions,
+            "hit_rate": saved / lookups if lookups else 0.0,
+            "saved_api_calls": saved,
+        }
+
+
+cache = TranscriptCache()
@@ -1,13 +1,8 @@
 import hashlib
 import os
+import threading
 import httpx
 import asyncio # Necesario para asyncio.sleep y para que retry funcione con async
-try:
-    import boto3  # type: ignore
-    from botocore.client import Config  # type: ignore
-except Exception:  # pragma: no cover - boto3 might not be available
-    boto3 = None
-    Config = None
 from tenacity import retry, stop_after_attempt, wait_random_exponential, AsyncRetrying # Usar AsyncRetrying
 
 # Constants for the TTS configuration
@@ -32,19 +27,36 @@ R2_PUBLIC_BASE_URL = os.environ.get(
 CACHE_PREFIX = "tts-cache/"
 
 
+# El cliente S3 se crea en el primer uso: importar boto3/botocore cuesta
+# cientos de milisegundos y no debe retrasar el arranque ni /health.
 s3_client = None
-if boto3:
-    try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=R2_ENDPOINT_URL,
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            config=Config(signature_version="s3v4"),
-        )
-    except Exception as e:
-        print(f"Error initializing R2 S3 client: {e}")
-        s3_client = None
+_s3_lock = threading.Lock()
+_s3_init_attempted = False
+
+
+def get_s3_client():
+    """Return the shared R2 S3 client, creating it on first use (thread-safe)."""
+    global s3_client, _s3_init_attempted
+    if s3_client is not None or _s3_init_attempted:
+        return s3_client
+    with _s3_lock:
+        if s3_client is None and not _s3_init_attempted:
+            _s3_init_attempted = True
+            try:
+                import boto3  # type: ignore
+                from botocore.client import Config  # type: ignore
+
+                s3_client = boto3.client(
+                    "s3",
+                    endpoint_url=R2_ENDPOINT_URL,
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                    config=Config(signature_version="s3v4"),
+                )
+            except Exception as e:  # pragma: no cover - boto3 might not be available
+                print(f"Error initializing R2 S3 client: {e}")
+                s3_client = None
+    return s3_client
 
 
 # Modificación: Hacer _fetch_tts_audio asíncrona
@@ -62,6 +74,30 @@ async def _fetch_tts_audio(text: str) -> bytes:
     resp.raise_for_status()
     return resp.content
 
+async def stream_pcm(text: str):
+    """Stream raw PCM (24 kHz, 16-bit, mono) from OpenAI's TTS API.
+
+    Yields the audio as it arrives so playback can start on the first bytes.
+    Used by the websocket playback path, so there is no retry: a late
+    reply is worse than no reply in a live call. Cancelling the consumer
+    closes the response and aborts the download.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set")
+    headers = {"Authorization": f"Bearer {api_key}"}
+    payload = {"model": MODEL, "voice": VOICE, "input": text, "response_format": "pcm"}
+    async with httpx.AsyncClient(timeout=10) as client:
+        async with client.stream(
+            "POST",
+            "https://api.openai.com/v1/audio/speech",
+            headers=headers,
+            json=payload,
+        ) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_bytes():
+                yield chunk
+
 # Modificación: Hacer _upload_to_r2 asíncrona
 async def _upload_to_r2(key: str, data: bytes) -> None:
     """Upload MP3 data to Cloudflare R2 using boto3."""
@@ -70,8 +106,9 @@ async def _upload_to_r2(key: str, data: bytes) -> None:
     # se suele usar loop.run_in_executor o librerías async-aware como aioboto3.
     # Por simplicidad aquí, la llamaremos directamente, pero ten en cuenta esto en producción.
     # Para una implementación puramente asíncrona, considera 'aioboto3'.
-    if s3_client:
-        await asyncio.to_thread(s3_client.put_object, Bucket=R2_BUCKET_NAME, Key=key, Body=data, ContentType="audio/mpeg")
+    client = get_s3_client()
+    if client:
+        await asyncio.to_thread(client.put_object, Bucket=R2_BUCKET_NAME, Key=key, Body=data, ContentType="audio/mpeg")
     else:
         raise RuntimeError("S3 client not initialized. Cannot upload to R2.")
 
@@ -79,7 +116,8 @@ async def _upload_to_r2(key: str, data: bytes) -> None:
 # Modificación: Hacer speak asíncrona
 async def speak(text: str) -> str:
     """Return the R2 URL for the given text's TTS audio."""
-    if not all([s3_client, R2_BUCKET_NAME, R2_ENDPOINT_URL, R2_PUBLIC_BASE_URL]):
+    client = await asyncio.to_thread(get_s3_client)
+    if not all([client, R2_BUCKET_NAME, R2_ENDPOINT_URL, R2_PUBLIC_BASE_URL]):
         raise RuntimeError(
             "R2 configuration incomplete. Check R2_ENDPOINT_URL, R2_BUCKET_NAME, "
             "AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, and R2_PUBLIC_BASE_URL "
@@ -93,12 +131,12 @@ async def speak(text: str) -> str:
 
     # Comprobar si el objeto existe en R2 usando head_object de boto3
     try:
-        if s3_client:
-            await asyncio.to_thread(s3_client.head_object, Bucket=R2_BUCKET_NAME, Key=key)
+        if client:
+            await asyncio.to_thread(client.head_object, Bucket=R2_BUCKET_NAME, Key=key)
             return url # Si head_object tiene éxito, el objeto existe, devolver la URL pública
         else:
             raise RuntimeError("S3 client not initialized. Cannot check R2.")
-    except s3_client.exceptions.ClientError as e:
+    except client.exceptions.ClientError as e:
         if e.response["Error"]["Code"] == "404":
             pass  # Objeto no encontrado, continuar para generarlo y subirlo
         else:
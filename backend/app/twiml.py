@@ -0,0 +1,44 @@
+# backend/app/twiml.py
+from functools import lru_cache
+from string import Template
+from xml.sax.saxutils import escape, quoteattr
+
+# Plantillas compiladas una sola vez al importar el módulo.
+_HEADER = "<?xml version='1.0' encoding='UTF-8'?>"
+
+_START = Template(
+    _HEADER + "<Response>"
+    "<Start><Stream url=$stream_url /></Start>"
+    "$greeting"
+    # Mantener la llamada abierta mientras se transmite el audio
+    "<Pause length='20'/>"
+    "</Response>"
+)
+
+_CONNECT = Template(
+    _HEADER + "<Response>" "<Connect><Stream url=$stream_url /></Connect>" "</Response>"
+)
+
+_SAY = Template(_HEADER + "<Response><Say>$text</Say></Response>")
+
+
+@lru_cache(maxsize=128)
+def render_start(stream_url: str, greeting_url: str | None, say_text: str) -> str:
+    """TwiML unidireccional: <Play> del saludo si hay URL, si no <Say>."""
+    if greeting_url:
+        greeting = f"<Play>{escape(greeting_url)}</Play>"
+    else:
+        greeting = f"<Say>{escape(say_text)}</Say>"
+    return _START.substitute(stream_url=quoteattr(stream_url), greeting=greeting)
+
+
+@lru_cache(maxsize=16)
+def render_connect(stream_url: str) -> str:
+    """TwiML bidireccional: el audio de respuesta viaja por el WebSocket."""
+    return _CONNECT.substitute(stream_url=quoteattr(stream_url))
+
+
+@lru_cache(maxsize=16)
+def render_say(say_text: str) -> str:
+    """TwiML degradado sin Media Stream, para workers saturados."""
+    return _SAY.substitute(text=escape(say_text))
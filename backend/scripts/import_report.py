@@ -0,0 +1,51 @@
+"""Informe de tiempo de importación del backend.
+
+Uso: python backend/scripts/import_report.py [modulo] [--top N]
+
+Ejecuta `python -X importtime` en un proceso limpio y lista los módulos con
+mayor tiempo acumulado, para detectar dependencias pesadas en el arranque.
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def import_times(module: str) -> list[tuple[int, int, str]]:
+    """Devuelve (self_us, cumulative_us, module) por cada import realizado."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="backend.app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = max((cum for _, cum, name in rows if name == args.module), default=0)
+    print(f"import {args.module}: {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+    for self_us, cumulative_us, name in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.app import admission, hedge, main, stt, transcript_cache
+
+client = TestClient(main.app)
+
+
+def test_controller_limits_concurrent_calls():
+    ctl = admission.AdmissionController(max_calls=2, lag_limit=1.0)
+    assert ctl.try_admit()
+    assert ctl.try_admit()
+    assert not ctl.try_admit()
+    assert ctl.rejected == 1
+    ctl.release()
+    assert ctl.try_admit()
+
+
+def test_controller_overloaded_on_loop_lag():
+    ctl = admission.AdmissionController(max_calls=10, lag_limit=0.1)
+    ctl.loop_lag = 0.5
+    assert ctl.overloaded()
+    assert not ctl.try_admit()
+
+
+def test_health_reports_overload(monkeypatch):
+    ctl = admission.AdmissionController(max_calls=0, lag_limit=1.0)
+    monkeypatch.setattr(admission, "controller", ctl)
+
+    response = client.get("/health")
+    assert response.status_code == 503
+
+
+def test_voice_degrades_to_say_when_overloaded(monkeypatch):
+    ctl = admission.AdmissionController(max_calls=0, lag_limit=1.0)
+    monkeypatch.setattr(admission, "controller", ctl)
+
+    response = client.post("/voice")
+    assert "<Say>" in response.text
+    assert "<Stream" not in response.text
+
+
+def test_stt_rejects_when_full(monkeypatch):
+    ctl = admission.AdmissionController(max_calls=0, lag_limit=1.0)
+    monkeypatch.setattr(admission, "controller", ctl)
+
+    class FakeWS:
+        close_code = None
+        accepted = False
+
+        async def accept(self):
+            self.accepted = True
+
+        async def close(self, code: int = 1000):
+            self.close_code = code
+
+    ws = FakeWS()
+    asyncio.run(main.websocket_stt(ws))
+    assert ws.close_code == 1013
+    assert not ws.accepted
+
+
+def test_stalled_whisper_sheds_oldest_chunks(monkeypatch):
+    ctl = admission.AdmissionController(max_calls=10, lag_limit=60.0)
+    monkeypatch.setattr(admission, "controller", ctl)
+    monkeypatch.setattr(admission, "MAX_BUFFER_BYTES", 2 * stt.CHUNK_SIZE)
+    monkeypatch.setattr(hedge, "requester", hedge.HedgedRequester(enabled=False))
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    release = threading.Event()
+    transcribed = []
+
+    def stalled_transcribe(wav: bytes) -> str:
+        release.wait(5)  # Whisper colgado hasta que llega el 'stop'
+        transcribed.append(wav)
+        return ""
+
+    monkeypatch.setattr(stt, "transcribe_chunk", stalled_transcribe)
+    chunks = [bytes([i + 1]) * stt.CHUNK_SIZE for i in range(5)]
+    incoming = [
+        json.dumps(
+            {"event": "media", "media": {"payload": base64.b64encode(c).decode()}}
+        )
+        for c in chunks
+    ]
+    incoming.append(json.dumps({"event": "stop"}))
+
+    class FakeWS:
+        async def receive(self):
+            await asyncio.sleep(0)  # Deja correr a la tarea de transcripción
+            if len(incoming) == 1:
+                release.set()
+            return {"text": incoming.pop(0)}
+
+        async def send_text(self, text: str):
+            pass
+
+    asyncio.run(stt.process_stream(FakeWS(), "CA-shed"))
+
+    # El primer bloque ya estaba en Whisper; de los cuatro siguientes solo
+    # caben los dos más recientes.
+    assert ctl.shed_bytes == 2 * stt.CHUNK_SIZE
+    assert len(transcribed) == 3
@@ -0,0 +1,107 @@
+import asyncio
+import base64
+import json
+import os
+import time
+
+from backend.app import chunking, hedge, sessions, stt, transcript_cache
+
+
+def simulate(controller, script):
+    """
+    Simulación determinista contra un backend con latencia programada.
+
+    `script` es una lista de (bloques, rtt). Mientras Whisper responde sigue
+    llegando audio; lo que supera la duración del bloque queda pendiente.
+    """
+    backlog = 0.0
+    trajectory = []
+    for chunks, rtt in script:
+        for _ in range(chunks):
+            backlog = max(0.0, backlog + rtt - controller.seconds)
+            trajectory.append(controller.observe(rtt, backlog))
+    return trajectory
+
+
+SCRIPT = [(20, 0.2), (20, 4.0), (30, 0.2)]
+
+
+def test_controller_tracks_scripted_latency():
+    ctl = chunking.ChunkController(5, min_seconds=2, max_seconds=10)
+    trajectory = simulate(ctl, SCRIPT)
+
+    fast, slow, recovered = trajectory[:20], trajectory[20:40], trajectory[40:]
+    assert fast[-1] == 2  # Whisper rápido: bloques mínimos
+    assert (
+        slow[-1] >= 4.0 / chunking.HIGH_PRESSURE
+    )  # Whisper lento: bloques más grandes
+    assert recovered[-1] == 2
+    assert all(2 <= s <= 10 for s in trajectory)
+    assert ctl.grows > 0 and ctl.shrinks > 0
+
+
+def test_simulation_is_deterministic():
+    a = simulate(chunking.ChunkController(5, 2, 10), SCRIPT)
+    b = simulate(chunking.ChunkController(5, 2, 10), SCRIPT)
+    assert a == b
+
+
+def test_backlog_grows_chunks_even_with_fast_rtt():
+    ctl = chunking.ChunkController(4, min_seconds=2, max_seconds=10)
+    for _ in range(chunking.WARMUP_SAMPLES):
+        ctl.observe(0.1, 8.0)
+    assert ctl.seconds > 4
+
+
+def test_call_chunker_uses_slower_of_call_and_worker():
+    worker = chunking.ChunkController(5, 2, 10)
+    chunker = chunking.CallChunker(worker, 8000, 5)
+    worker.seconds = 8
+    assert chunker.chunk_bytes() == 64000
+    chunker.call.seconds = 9
+    assert chunker.seconds == 9
+
+
+def test_process_stream_adapts_to_scripted_whisper_latency(monkeypatch):
+    """
+    Llamada completa contra un Whisper falso: el audio llega en tiempo real
+    (tramas de 20 ms) y cada bloque tarda lo que marca el guion.
+    """
+    monkeypatch.setattr(stt, "SAMPLE_RATE", 8000)
+    monkeypatch.setattr(stt, "CHUNK_SECONDS", 0.05)
+    monkeypatch.setattr(stt, "worker_chunks", chunking.ChunkController(0.05, 0.05, 0.4))
+    monkeypatch.setattr(chunking, "SHRINK_STEP", 0.05)
+    monkeypatch.setattr(hedge, "requester", hedge.HedgedRequester(enabled=False))
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    script = [0.005] * 6 + [0.2] * 8 + [0.005] * 12
+    trajectory = []
+
+    def scripted_transcribe(wav: bytes) -> str:
+        session = sessions.registry.sessions()[-1]
+        trajectory.append((session.chunker.seconds, session.pending_bytes))
+        time.sleep(script[min(len(trajectory), len(script)) - 1])
+        return ""
+
+    monkeypatch.setattr(stt, "transcribe_chunk", scripted_transcribe)
+
+    class RealTimeWS:
+        async def receive(self):
+            if len(trajectory) >= len(script):
+                return {"text": json.dumps({"event": "stop"})}
+            await asyncio.sleep(0.02)
+            payload = base64.b64encode(os.urandom(160)).decode()
+            return {
+                "text": json.dumps({"event": "media", "media": {"payload": payload}})
+            }
+
+        async def send_text(self, text: str):
+            pass
+
+    asyncio.run(stt.process_stream(RealTimeWS(), "CA-sim"))
+
+    fast, slow, recovered = trajectory[:6], trajectory[6:14], trajectory[14:]
+    assert fast[-1][0] == 0.05  # Whisper rápido: bloques mínimos
+    assert any(backlog > 0 for _, backlog in slow)  # La cola real se llena
+    peak = max(seconds for seconds, _ in slow + recovered)
+    assert peak > 0.05  # Whisper lento: bloques más grandes
+    assert recovered[-1][0] < peak  # Y vuelven a encoger al recuperarse
@@ -0,0 +1,35 @@
+import base64
+import json
+
+from backend.app import frames
+
+PAYLOAD = base64.b64encode(bytes(range(160))).decode()
+
+TWILIO_MEDIA = (
+    '{"event":"media","sequenceNumber":"3","media":{"track":"inbound","chunk":"1",'
+    f'"timestamp":"5","payload":"{PAYLOAD}"}},"streamSid":"MZ123"}}'
+)
+
+
+def test_media_payload_fast_path():
+    assert frames.media_payload(TWILIO_MEDIA) == PAYLOAD
+
+
+def test_media_payload_accepts_spaced_json():
+    text = json.dumps({"event": "media", "media": {"payload": PAYLOAD}})
+    assert frames.media_payload(text) == PAYLOAD
+
+
+def test_media_payload_ignores_other_events():
+    assert frames.media_payload('{"event":"stop","streamSid":"MZ123"}') is None
+    assert frames.media_payload('{"event":"media","media":{}}') is None
+    assert (
+        frames.media_payload('{"event":"media","media":{"payload":"ab\\/cd"}}') is None
+    )
+
+
+def test_decode_into_appends_to_buffer():
+    buffer = bytearray(b"\x01")
+    frame = frames.decode_into(buffer, PAYLOAD)
+    assert frame == bytes(range(160))
+    assert buffer == b"\x01" + bytes(range(160))
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+from backend.app import hedge
+
+
+def test_fast_request_is_not_hedged():
+    requester = hedge.HedgedRequester(budget=1.0, deadline=1.0)
+    result = asyncio.run(requester.call(lambda: "hola"))
+    assert result == "hola"
+    assert requester.hedged == 0
+    assert len(requester.latencies) == 1
+
+
+def test_slow_request_is_hedged_and_hedge_wins(monkeypatch):
+    monkeypatch.setattr(hedge, "DEFAULT_HEDGE_DELAY", 0.02)
+    requester = hedge.HedgedRequester(budget=1.0, deadline=1.0)
+    calls = []
+    lock = threading.Lock()
+
+    def flaky():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        time.sleep(0.3 if first else 0.01)
+        return "lento" if first else "rápido"
+
+    result = asyncio.run(requester.call(flaky))
+    assert result == "rápido"
+    assert requester.hedged == 1
+    assert requester.metrics()["hedge_win_rate"] == 1.0
+
+
+def test_hedge_budget_caps_duplicates(monkeypatch):
+    monkeypatch.setattr(hedge, "DEFAULT_HEDGE_DELAY", 0.0)
+    requester = hedge.HedgedRequester(budget=0.0, deadline=1.0)
+
+    def slow():
+        time.sleep(0.02)
+        return "hola"
+
+    assert asyncio.run(requester.call(slow)) == "hola"
+    assert requester.hedged == 0
+
+
+def test_deadline_returns_none():
+    requester = hedge.HedgedRequester(enabled=False, deadline=0.02)
+
+    def too_slow():
+        time.sleep(0.1)
+        return "tarde"
+
+    assert asyncio.run(requester.call(too_slow)) is None
+    assert requester.deadline_misses == 1
+
+
+def test_hedge_delay_uses_p90():
+    requester = hedge.HedgedRequester()
+    requester.latencies.extend(i / 100 for i in range(1, 101))
+    assert requester.hedge_delay() == 0.91
+
+
+def test_deadline_miss_records_censored_sample():
+    requester = hedge.HedgedRequester(enabled=False, deadline=0.02)
+
+    def too_slow():
+        time.sleep(0.1)
+        return "tarde"
+
+    asyncio.run(requester.call(too_slow))
+    assert list(requester.latencies) == [0.02]
+
+
+def test_error_does_not_win_and_triggers_hedge():
+    requester = hedge.HedgedRequester(budget=1.0, deadline=1.0)
+    calls = []
+    lock = threading.Lock()
+
+    def fails_first():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        if first:
+            raise RuntimeError("Whisper 503")
+        return "hola"
+
+    # El p90 por defecto es 2 s: la copia sale en cuanto falla el original.
+    assert asyncio.run(requester.call(fails_first)) == "hola"
+    assert requester.hedged == 1
+    assert requester.failures == 1
+    assert requester.hedge_wins == 1
+
+
+def test_all_attempts_failing_returns_none():
+    requester = hedge.HedgedRequester(budget=1.0, deadline=1.0)
+
+    def always_fails():
+        raise RuntimeError("Whisper 503")
+
+    assert asyncio.run(requester.call(always_fails)) is None
+    assert requester.failures == 2
+    assert requester.deadline_misses == 0
+
+
+def test_losing_coroutine_is_cancelled(monkeypatch):
+    monkeypatch.setattr(hedge, "DEFAULT_HEDGE_DELAY", 0.02)
+    requester = hedge.HedgedRequester(budget=1.0, deadline=1.0)
+    calls = []
+    cancelled = []
+
+    async def flaky():
+        calls.append(None)
+        try:
+            await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(len(calls))
+            raise
+        return "rápido"
+
+    started = time.monotonic()
+    assert asyncio.run(requester.call(flaky)) == "rápido"
+    assert time.monotonic() - started < 1.0
+    assert cancelled  # La petición original se abortó, no sigue en segundo plano
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Presupuesto de arranque: importar la app no debe pagar clientes pesados.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import backend.app.main
+print(time.perf_counter() - t)
+print("boto3" in sys.modules)
+"""
+
+
+def test_import_main_within_budget():
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, boto3_loaded = proc.stdout.split()
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+    assert boto3_loaded == "False"
@@ -0,0 +1,187 @@
+import asyncio
+import audioop
+import base64
+import json
+import math
+import os
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.app import hedge, main, playback, stt, transcript_cache, tts
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+
+def tone(ms: int, rate: int = 8000) -> bytes:
+    samples = rate * ms // 1000
+    pcm = b"".join(
+        int(8000 * math.sin(2 * math.pi * 440 * i / rate)).to_bytes(
+            2, "little", signed=True
+        )
+        for i in range(samples)
+    )
+    return audioop.lin2ulaw(pcm, 2)
+
+
+def test_pcm_to_mulaw_resamples_to_8k():
+    pcm = b"\x00\x00" * 24000  # 1 s a 24 kHz
+    mulaw = playback.pcm_to_mulaw(pcm)
+    assert abs(len(mulaw) - 8000) <= 2
+
+
+def test_encoder_handles_chunks_split_mid_sample():
+    pcm = os.urandom(24000)
+    encoder = playback.MulawEncoder()
+    pieces = [pcm[:4801], pcm[4801:4802], pcm[4802:17001], pcm[17001:]]
+    streamed = b"".join(encoder.encode(p) for p in pieces)
+    assert streamed == playback.pcm_to_mulaw(pcm)
+
+
+def test_split_frames_pads_last_frame():
+    frames = playback.split_frames(b"\x00" * (playback.FRAME_BYTES * 2 + 10))
+    assert [len(f) for f in frames] == [playback.FRAME_BYTES] * 3
+    assert frames[-1].endswith(playback.MULAW_SILENCE)
+
+
+def test_player_sends_media_then_mark(monkeypatch):
+    monkeypatch.setattr(playback, "PREBUFFER_FRAMES", 10)
+    ws = FakeWS()
+
+    async def run():
+        player = playback.AudioPlayer(ws, "MZ123")
+        await player.play(b"\xff" * playback.FRAME_BYTES * 3)
+        assert player.playing
+        player.on_mark(ws.sent[-1]["mark"]["name"])
+        assert not player.playing
+
+    asyncio.run(run())
+
+    assert [m["event"] for m in ws.sent] == ["media", "media", "media", "mark"]
+    assert all(m["streamSid"] == "MZ123" for m in ws.sent)
+    assert len(base64.b64decode(ws.sent[0]["media"]["payload"])) == playback.FRAME_BYTES
+
+
+def test_player_clear_interrupts_playback():
+    ws = FakeWS()
+
+    async def run():
+        player = playback.AudioPlayer(ws, "MZ123")
+        player.play(b"\xff" * playback.FRAME_BYTES * 500)
+        await asyncio.sleep(0.05)
+        await player.clear()
+        assert not player.playing
+
+    asyncio.run(run())
+
+    assert ws.sent[-1] == {"event": "clear", "streamSid": "MZ123"}
+    assert len(ws.sent) < 500
+
+
+def test_say_plays_tts_while_it_downloads(monkeypatch):
+    monkeypatch.setattr(playback, "PREBUFFER_FRAMES", 5)
+    ws = FakeWS()
+    media_before_second_chunk = []
+
+    async def fake_stream_pcm(text: str):
+        yield b"\x00" * 4801  # 0,1 s a 24 kHz, cortado a mitad de muestra
+        await asyncio.sleep(0.05)
+        media_before_second_chunk.append(sum(m["event"] == "media" for m in ws.sent))
+        yield b"\x00" * 4799
+
+    monkeypatch.setattr(tts, "stream_pcm", fake_stream_pcm)
+
+    async def run():
+        await playback.AudioPlayer(ws, "MZ123").say("hola")
+
+    asyncio.run(run())
+
+    assert media_before_second_chunk[0] > 0  # Sonó antes de acabar la descarga
+    events = [m["event"] for m in ws.sent]
+    assert events == ["media"] * 10 + ["mark"]
+
+
+def test_vad_requires_consecutive_speech_frames():
+    vad = playback.VoiceActivityDetector(threshold=500, min_frames=2)
+    assert not vad.feed(b"\xff" * 160)
+    assert not vad.feed(tone(20))
+    assert vad.feed(tone(20))
+    assert not vad.feed(b"\xff" * 160)
+
+
+def test_stream_barge_in_clears_player(monkeypatch):
+    ws = FakeWS()
+    speech = base64.b64encode(tone(20)).decode()
+    incoming = [json.dumps({"event": "media", "media": {"payload": speech}})] * 3
+    incoming.append(json.dumps({"event": "stop"}))
+
+    async def receive():
+        return {"text": incoming.pop(0)} if incoming else None
+
+    ws.receive = receive
+
+    async def run():
+        player = playback.AudioPlayer(ws, "MZ123")
+        player.play(b"\xff" * playback.FRAME_BYTES * 500)
+        await stt.process_stream(ws, "CA123", player)
+
+    monkeypatch.setattr(stt, "transcribe_chunk", lambda wav: "")
+    asyncio.run(run())
+
+    assert {"event": "clear", "streamSid": "MZ123"} in ws.sent
+
+
+def test_barge_in_while_whisper_is_busy(monkeypatch):
+    ws = FakeWS()
+    release = threading.Event()
+    cleared_while_busy = []
+
+    def stalled_transcribe(wav: bytes) -> str:
+        release.wait(5)
+        return ""
+
+    loud = base64.b64encode(bytes(range(256)) * (stt.CHUNK_SIZE // 256 + 1)).decode()
+    speech = base64.b64encode(tone(20)).decode()
+    incoming = [json.dumps({"event": "media", "media": {"payload": loud}})]
+    incoming += [json.dumps({"event": "media", "media": {"payload": speech}})] * 3
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        if incoming:
+            return {"text": incoming.pop(0)}
+        cleared_while_busy.append({"event": "clear", "streamSid": "MZ123"} in ws.sent)
+        release.set()
+        return {"text": json.dumps({"event": "stop"})}
+
+    ws.receive = receive
+    monkeypatch.setattr(stt, "transcribe_chunk", stalled_transcribe)
+    monkeypatch.setattr(hedge, "requester", hedge.HedgedRequester(enabled=False))
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+
+    async def run():
+        player = playback.AudioPlayer(ws, "MZ123")
+        player.play(b"\xff" * playback.FRAME_BYTES * 500)
+        await stt.process_stream(ws, "CA123", player)
+
+    asyncio.run(run())
+
+    assert cleared_while_busy == [True]
+
+
+def test_voice_connect_mode(monkeypatch):
+    async def fail_speak(text: str):
+        raise AssertionError("connect mode must not upload to R2")
+
+    monkeypatch.setattr(main, "STREAM_MODE", "connect")
+    monkeypatch.setattr(main, "speak", fail_speak)
+    monkeypatch.setattr(tts, "speak", fail_speak)
+
+    response = TestClient(main.app).post("/voice")
+    assert "<Connect>" in response.text
+    assert "<Play>" not in response.text
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import random
+
+from backend.app import recorder, tts
+
+
+class FakeS3:
+    def __init__(self, fail_upload=False):
+        self.fail_upload = fail_upload
+        self.parts = []
+        self.completed = None
+        self.aborted = False
+
+    def create_multipart_upload(self, Bucket=None, Key=None, ContentType=None):
+        return {"UploadId": "up-1"}
+
+    def upload_part(
+        self,
+        Bucket=None,
+        Key=None,
+        PartNumber=None,
+        UploadId=None,
+        Body=None,
+        ContentLength=None,
+    ):
+        if self.fail_upload:
+            raise RuntimeError("R2 down")
+        body = Body.read()
+        assert len(body) == ContentLength
+        self.parts.append((PartNumber, body))
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(
+        self, Bucket=None, Key=None, UploadId=None, MultipartUpload=None
+    ):
+        self.completed = MultipartUpload["Parts"]
+
+    def abort_multipart_upload(self, Bucket=None, Key=None, UploadId=None):
+        self.aborted = True
+
+
+def noise(n_frames):
+    rng = random.Random(0)
+    return [rng.randbytes(160) for _ in range(n_frames)]
+
+
+def record(frames_):
+    async def run():
+        rec = recorder.CallRecorder("CA1", bucket="bucket")
+        for frame in frames_:
+            rec.write(frame)
+        rec.close()
+        await rec.task
+        return rec
+
+    return asyncio.run(run())
+
+
+def test_recording_is_uploaded_in_parts(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setattr(tts, "s3_client", s3)
+    monkeypatch.setattr(recorder, "PART_SIZE", 1024)
+    monkeypatch.setattr(recorder, "MAX_PENDING_PARTS", 1000)
+    audio = noise(600)
+
+    rec = record(audio)
+
+    assert len(s3.parts) > 1
+    assert [p["PartNumber"] for p in s3.completed] == list(range(1, len(s3.parts) + 1))
+    assert gzip.decompress(b"".join(body for _, body in s3.parts)) == b"".join(audio)
+    assert rec.bytes_in == 600 * 160
+
+
+def test_upload_failure_aborts(monkeypatch):
+    s3 = FakeS3(fail_upload=True)
+    monkeypatch.setattr(tts, "s3_client", s3)
+
+    rec = record([b"\x00" * 160])
+
+    assert rec.failed
+    assert s3.aborted
+    assert s3.completed is None
+
+
+def test_backlog_abandons_recording(monkeypatch):
+    monkeypatch.setattr(recorder, "PART_SIZE", 16)
+    monkeypatch.setattr(recorder, "MAX_PENDING_PARTS", 1)
+
+    async def run():
+        rec = recorder.CallRecorder("CA1", bucket="bucket")
+        # Sin ceder el loop, la subida no consume la cola.
+        for frame in noise(1000):
+            rec.write(frame)
+        assert rec.failed
+        assert rec.buffered_bytes() <= 2 * recorder.PART_SIZE
+        rec.task.cancel()
+
+    asyncio.run(run())
+
+
+def test_parts_are_spooled_to_disk(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setattr(tts, "s3_client", s3)
+    monkeypatch.setattr(recorder, "PART_SIZE", 64 * 1024)
+    monkeypatch.setattr(recorder, "SPOOL_MEMORY_BYTES", 4096)
+    monkeypatch.setattr(recorder, "MAX_PENDING_PARTS", 1000)
+    audio = noise(1000)
+
+    async def run():
+        rec = recorder.CallRecorder("CA1", bucket="bucket")
+        for frame in audio:
+            rec.write(frame)
+            assert rec.buffered_bytes() <= 4096
+        assert rec._part._rolled  # La parte en curso ya está en disco
+        rec.close()
+        await rec.task
+
+    asyncio.run(run())
+
+    assert len(s3.parts) == 3
+    assert gzip.decompress(b"".join(body for _, body in s3.parts)) == b"".join(audio)
+
+
+def test_start_disabled_by_default():
+    assert recorder.start("CA1") is None
@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app import main, sessions, stt
+
+
+class IdleWS:
+    """WebSocket que entrega los mensajes dados y después se queda colgado."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+        self.closed = False
+
+    async def receive(self):
+        if self.messages:
+            return {"text": self.messages.pop(0)}
+        await asyncio.sleep(3600)
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def test_session_snapshot_counts_bytes():
+    session = sessions.CallSession("CA1", "MZ1")
+    session.buffer = b"\xff" * 1000
+    snap = session.snapshot()
+    assert snap["call_id"] == "CA1"
+    assert snap["buffered_bytes"] == 1000
+    assert snap["memory_bytes"] >= 1000
+    assert not hasattr(session, "__dict__")
+
+
+def test_idle_stream_is_flushed_and_closed(monkeypatch):
+    calls = []
+
+    def fake_transcribe(wav: bytes) -> str:
+        calls.append(len(wav))
+        return "hola"
+
+    monkeypatch.setattr(stt, "transcribe_chunk", fake_transcribe)
+    monkeypatch.setattr(sessions, "IDLE_TIMEOUT_SECONDS", 0.05)
+    payload = base64.b64encode(b"\x00" * 800).decode()
+    ws = IdleWS([json.dumps({"event": "media", "media": {"payload": payload}})])
+
+    asyncio.run(stt.process_stream(ws, "CA-idle"))
+
+    assert ws.closed
+    assert len(calls) == 1
+    assert len(sessions.registry) == 0
+
+
+def test_registry_reaps_hung_sessions():
+    registry = sessions.SessionRegistry()
+
+    async def run():
+        async def hung():
+            registry.open("CA-hung")
+            await asyncio.sleep(3600)
+
+        task = asyncio.create_task(hung())
+        await asyncio.sleep(0)
+        reaped = registry.reap(max_idle=-1)
+        assert [s.call_id for s in reaped] == ["CA-hung"]
+        await asyncio.sleep(0)
+        assert task.cancelled()
+
+    asyncio.run(run())
+    assert len(registry) == 0
+
+
+def test_calls_endpoint_lists_active_sessions(monkeypatch):
+    registry = sessions.SessionRegistry()
+    registry.open("CA-live")
+    monkeypatch.setattr(sessions, "registry", registry)
+
+    data = TestClient(main.app).get("/calls").json()
+    assert data["active"] == 1
+    assert data["calls"][0]["call_id"] == "CA-live"
@@ -0,0 +1,123 @@
+import asyncio
+
+from backend.app import main, store, supabase
+
+
+def make_store():
+    s = store.TranscriptStore(":memory:")
+    s.add("CA1", 3.0, 4.0, "tercera frase")
+    s.add("CA1", 1.0, 2.0, "hola buenos días")
+    s.add("CA2", 1.0, 2.0, "quiero cancelar mi pedido")
+    s.add("CA1", 2.0, 3.0, "necesito ayuda con mi pedido")
+    return s
+
+
+def test_transcript_is_ordered_and_paginated():
+    s = make_store()
+    page = s.transcript("CA1", offset=0, limit=2)
+    assert [r["text"] for r in page] == [
+        "hola buenos días",
+        "necesito ayuda con mi pedido",
+    ]
+    assert [r["ts_start"] for r in s.transcript("CA1", offset=2, limit=2)] == [3.0]
+
+
+def test_full_text_search():
+    s = make_store()
+    assert s.fts
+    results = s.search("pedido")
+    assert {r["call_id"] for r in results} == {"CA1", "CA2"}
+    assert (
+        s.search('cancelar "')[0]["call_id"] == "CA2"
+    )  # comillas sueltas no rompen FTS5
+    assert s.search("   ") == []
+
+
+def test_endpoints_read_local_store(monkeypatch):
+    monkeypatch.setattr(store, "store", make_store())
+    data = main.call_transcript("CA1", offset=1, limit=1)
+    assert [s["text"] for s in data["segments"]] == ["necesito ayuda con mi pedido"]
+    assert main.search_transcripts("cancelar")["results"][0]["call_id"] == "CA2"
+
+
+def test_sync_marks_rows_after_supabase_save(monkeypatch):
+    s = make_store()
+    saved = []
+
+    async def fake_save(call_id, ts_start, ts_end, text):
+        saved.append(text)
+        return len(saved) != 3  # la tercera falla
+
+    monkeypatch.setattr(supabase, "configured", lambda: True)
+    monkeypatch.setattr(supabase, "save_transcript", fake_save)
+
+    assert asyncio.run(s.sync_once()) == 2
+    assert s.unsynced() == 2
+    # La fila que falló espera su backoff; la siguiente no queda bloqueada.
+    assert asyncio.run(s.sync_once()) == 1
+    assert saved[-1] == "necesito ayuda con mi pedido"
+    assert s.unsynced() == 1
+
+
+def test_failing_row_is_dead_lettered(monkeypatch):
+    s = make_store()
+
+    async def fail(*args):
+        return False
+
+    monkeypatch.setattr(supabase, "configured", lambda: True)
+    monkeypatch.setattr(supabase, "save_transcript", fail)
+    monkeypatch.setattr(store, "SYNC_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(store, "SYNC_INTERVAL", 0.0)
+
+    for _ in range(2):
+        assert asyncio.run(s.sync_once()) == 0
+    assert [r["text"] for r in s.dead()] == ["tercera frase"]
+    assert s.unsynced() == 3
+
+
+def test_workers_claim_disjoint_rows(tmp_path):
+    path = str(tmp_path / "t.db")
+    a, b = store.TranscriptStore(path), store.TranscriptStore(path)
+    for i in range(5):
+        a.add("CA1", float(i), float(i + 1), f"frase {i}")
+
+    first, second = a.claim(limit=3), b.claim(limit=3)
+    assert [r["id"] for r in first] == [1, 2, 3]
+    assert [r["id"] for r in second] == [4, 5]
+    assert b.claim() == []
+
+
+def test_prune_drops_old_synced_rows(monkeypatch):
+    s = make_store()
+    s.mark_synced([1, 3])
+    assert s.prune(now=store.RETENTION_SECONDS + 3.5) == 1  # solo id 3 es antigua
+    assert s.search("cancelar") == []
+    assert len(s.transcript("CA1")) == 3
+
+
+def test_save_falls_back_to_supabase(monkeypatch):
+    s = store.TranscriptStore("/nonexistent/dir/t.db")
+    saved = []
+
+    async def fake_save(call_id, ts_start, ts_end, text):
+        saved.append(text)
+        return True
+
+    monkeypatch.setattr(supabase, "save_transcript", fake_save)
+    asyncio.run(s.save("CA1", 1.0, 2.0, "hola"))
+    assert saved == ["hola"]
+    assert s.fallbacks == 1
+
+
+def test_syncer_exits_on_cancel(monkeypatch):
+    monkeypatch.setattr(supabase, "configured", lambda: False)
+    s = make_store()
+
+    async def run():
+        s.ensure_syncer()
+        await asyncio.sleep(0)
+        return s._syncer
+
+    # asyncio.run cancela el sincronizador al salir: no debe colgarse.
+    assert asyncio.run(run()).done()
@@ -1,5 +1,5 @@
 from backend.app.main import app
-from backend.app import stt
+from backend.app import stt, transcript_cache
 from fastapi.testclient import TestClient
 import base64
 import json
@@ -14,7 +14,9 @@ def test_stt_websocket(monkeypatch):
         return "hola"
 
     monkeypatch.setattr(stt, "transcribe_chunk", fake_transcribe)
-    chunk = b"\xff" * stt.CHUNK_SIZE
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    # Audio no silencioso: los bloques de silencio ya no llegan a Whisper.
+    chunk = (bytes(range(256)) * (stt.CHUNK_SIZE // 256 + 1))[: stt.CHUNK_SIZE]
     payload = base64.b64encode(chunk).decode()
     with client.websocket_connect("/stt") as ws:
         ws.send_text(json.dumps({"event": "start"}))
@@ -23,3 +25,88 @@ def test_stt_websocket(monkeypatch):
 
     assert messages == ["called"]
     assert ws.outgoing == ["hola"]
+
+
+def test_stt_repeated_and_silent_chunks_skip_whisper(monkeypatch):
+    client = TestClient(app)
+    messages = []
+
+    def fake_transcribe(wav: bytes) -> str:
+        messages.append("called")
+        return "música en espera"
+
+    monkeypatch.setattr(stt, "transcribe_chunk", fake_transcribe)
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    tone = base64.b64encode(
+        (bytes(range(256)) * (stt.CHUNK_SIZE // 256 + 1))[: stt.CHUNK_SIZE]
+    ).decode()
+    silence = base64.b64encode(b"\xff" * stt.CHUNK_SIZE).decode()
+    with client.websocket_connect("/stt") as ws:
+        ws.send_text(json.dumps({"event": "start"}))
+        for payload in (tone, silence, tone):
+            ws.send_text(json.dumps({"event": "media", "media": {"payload": payload}}))
+        ws.send_text(json.dumps({"event": "stop"}))
+
+    assert messages == ["called"]
+    metrics = transcript_cache.cache.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["silence_skips"] == 1
+    assert metrics["saved_api_calls"] == 2
+
+
+def test_failed_transcription_is_not_cached(monkeypatch):
+    client = TestClient(app)
+    calls = []
+
+    def flaky_transcribe(wav: bytes) -> str:
+        calls.append("called")
+        if len(calls) == 1:
+            raise RuntimeError("Whisper 503")
+        return "música en espera"
+
+    monkeypatch.setattr(stt, "transcribe_chunk", flaky_transcribe)
+    monkeypatch.setattr(
+        stt.hedge, "requester", stt.hedge.HedgedRequester(enabled=False)
+    )
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    tone = base64.b64encode(
+        (bytes(range(256)) * (stt.CHUNK_SIZE // 256 + 1))[: stt.CHUNK_SIZE]
+    ).decode()
+    with client.websocket_connect("/stt") as ws:
+        ws.send_text(json.dumps({"event": "start"}))
+        for _ in range(2):
+            ws.send_text(json.dumps({"event": "media", "media": {"payload": tone}}))
+        ws.send_text(json.dumps({"event": "stop"}))
+
+    assert calls == ["called", "called"]
+    assert transcript_cache.cache.metrics()["saved_api_calls"] == 0
+    assert ws.outgoing == ["música en espera"]
+
+
+def test_stt_websocket_skips_connected_event(monkeypatch):
+    client = TestClient(app)
+    calls = []
+    opened = []
+    process_stream = stt.process_stream
+
+    async def spy(ws, call_id, player=None):
+        opened.append((call_id, player.stream_sid if player else None))
+        await process_stream(ws, call_id, player)
+
+    monkeypatch.setattr(stt, "process_stream", spy)
+    monkeypatch.setattr(stt, "transcribe_chunk", lambda wav: calls.append(1) or "hola")
+    monkeypatch.setattr(transcript_cache, "cache", transcript_cache.TranscriptCache())
+    tone = base64.b64encode(
+        (bytes(range(256)) * (stt.CHUNK_SIZE // 256 + 1))[: stt.CHUNK_SIZE]
+    ).decode()
+    start = {"event": "start", "streamSid": "MZ1", "start": {"callSid": "CA1"}}
+    with client.websocket_connect("/stt") as ws:
+        ws.send_text(json.dumps({"event": "connected", "protocol": "Call"}))
+        ws.send_text(json.dumps(start))
+        ws.send_text(json.dumps({"event": "media", "media": {"payload": tone}}))
+        ws.send_text(json.dumps({"event": "stop"}))
+
+    assert opened == [("CA1", "MZ1")]
+    assert calls == [1]
+    # Stream bidireccional: nada de texto plano hacia Twilio.
+    assert ws.outgoing == []
@@ -0,0 +1,58 @@
+import audioop
+import math
+
+from backend.app import transcript_cache
+
+TONE = bytes(range(256)) * 4
+
+
+def test_silence_is_skipped():
+    cache = transcript_cache.TranscriptCache()
+    key, text = cache.lookup(b"\xff" * 1024)
+    assert text == ""
+    assert cache.silence_skips == 1
+
+
+def test_short_word_inside_silence_is_not_silence():
+    pcm = b"".join(
+        int(1500 * math.sin(2 * math.pi * 440 * i / 8000)).to_bytes(
+            2, "little", signed=True
+        )
+        for i in range(160)
+    )
+    word = audioop.lin2ulaw(pcm, 2)  # 20 ms de voz
+    chunk = b"\xff" * 20000 + word + b"\xff" * 20000
+    # La media de 5 s queda bajo el umbral, pero una trama lo supera.
+    assert (
+        audioop.rms(audioop.ulaw2lin(chunk, 2), 2)
+        < transcript_cache.SILENCE_RMS_THRESHOLD
+    )
+    assert not transcript_cache.is_silence(chunk)
+    assert transcript_cache.is_silence(b"\xff" * 40160)
+
+
+def test_repeated_chunk_hits():
+    cache = transcript_cache.TranscriptCache()
+    key, text = cache.lookup(TONE)
+    assert text is None
+    cache.store(key, "hola")
+    assert cache.lookup(TONE) == (key, "hola")
+    assert cache.metrics()["hits"] == 1
+
+
+def test_lru_eviction_by_size():
+    entry_cost = transcript_cache._ENTRY_OVERHEAD + len("texto")
+    cache = transcript_cache.TranscriptCache(max_bytes=entry_cost * 2)
+    chunks = [bytes([i]) + TONE for i in range(3)]
+    keys = [cache.lookup(c)[0] for c in chunks]
+
+    cache.store(keys[0], "texto")
+    cache.store(keys[1], "texto")
+    cache.lookup(chunks[0])  # keys[0] pasa a ser el más reciente
+    cache.store(keys[2], "texto")
+
+    assert len(cache) == 2
+    assert cache.size_bytes == entry_cost * 2
+    assert cache.evictions == 1
+    assert cache.lookup(chunks[1])[1] is None
+    assert cache.lookup(chunks[0])[1] == "texto"
@@ -0,0 +1,58 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.app import main, twiml
+
+client = TestClient(main.app)
+
+
+def test_render_start_escapes_xml():
+    doc = twiml.render_start("wss://host/stt?a=1&b='2'", None, "<hola> & adiós")
+    assert "url=\"wss://host/stt?a=1&amp;b='2'\"" in doc
+    assert "<Say>&lt;hola&gt; &amp; adiós</Say>" in doc
+
+
+def test_render_start_is_cached():
+    first = twiml.render_start("wss://host/stt", "https://audio/a.mp3", "hola")
+    second = twiml.render_start("wss://host/stt", "https://audio/a.mp3", "hola")
+    assert first is second
+    assert "<Play>https://audio/a.mp3</Play>" in first
+
+
+def test_voice_falls_back_to_say_after_deadline(monkeypatch):
+    async def slow_speak(text: str):
+        await asyncio.sleep(5)
+        return "https://audio/late.mp3"
+
+    monkeypatch.setattr(main, "speak", slow_speak)
+    monkeypatch.setattr(main, "_greeting_audio_url", None)
+    monkeypatch.setattr(main, "TTS_DEADLINE_SECONDS", 0.01)
+
+    response = client.post("/voice")
+    assert "<Say>" in response.text
+    assert "<Play>" not in response.text
+
+
+def test_greeting_url_is_memoized_after_success(monkeypatch):
+    calls = []
+
+    async def flaky_speak(text: str):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("R2 down")
+        return "https://audio/greeting.mp3"
+
+    monkeypatch.setattr(main, "speak", flaky_speak)
+    monkeypatch.setattr(main, "_greeting_task", None)
+    monkeypatch.setattr(main, "_greeting_audio_url", None)
+
+    async def run():
+        first = await main._greeting_url(1.0)  # Falla: se reintenta
+        urls = [await main._greeting_url(1.0) for _ in range(3)]
+        return first, urls
+
+    first, urls = asyncio.run(run())
+    assert first is None
+    assert urls == ["https://audio/greeting.mp3"] * 3
+    assert len(calls) == 2
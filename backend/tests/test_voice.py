@@ -1,6 +1,6 @@
 from fastapi.testclient import TestClient
 from backend.app.main import app
-from backend.app import tts
+from backend.app import main, tts
 
 client = TestClient(app)
 
@@ -11,6 +11,7 @@ def test_voice_endpoint(monkeypatch):
 
     monkeypatch.setattr(tts, "speak", fake_speak)
     monkeypatch.setattr("backend.app.main.speak", fake_speak, raising=False)
+    monkeypatch.setattr(main, "_greeting_audio_url", None)
     response = client.post("/voice")
     assert response.status_code == 200
     assert "<Play>https://audio/file.mp3</Play>" in response.text
@@ -23,6 +24,7 @@ def test_voice_endpoint_fallback(monkeypatch):
 
     monkeypatch.setattr(tts, "speak", fail_speak)
     monkeypatch.setattr("backend.app.main.speak", fail_speak, raising=False)
+    monkeypatch.setattr(main, "_greeting_audio_url", None)
 
     response = client.post("/voice")
     assert response.status_code == 200
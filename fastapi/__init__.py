@@ -7,9 +7,12 @@ __all__ = ["FastAPI", "Response", "WebSocket", "testclient", "responses"]
 
 
 class Response:
-    def __init__(self, content: str, media_type: str = "text/plain"):
+    def __init__(
+        self, content: str, media_type: str = "text/plain", status_code: int = 200
+    ):
         self.content = content
         self.text = content
+        self.status_code = status_code
         self.headers = {"content-type": media_type}
 
 
@@ -26,6 +29,9 @@ class WebSocket:
     async def send_text(self, data: str) -> None:  # pragma: no cover - stub
         pass
 
+    async def close(self, code: int = 1000) -> None:  # pragma: no cover - stub
+        pass
+
 
 class FastAPI:
     def __init__(self):
@@ -1,5 +1,8 @@
 class Response:
-    def __init__(self, content: str, media_type: str = "text/plain"):
+    def __init__(
+        self, content: str, media_type: str = "text/plain", status_code: int = 200
+    ):
         self.content = content
         self.text = content
+        self.status_code = status_code
         self.headers = {"content-type": media_type}
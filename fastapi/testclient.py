@@ -21,7 +21,7 @@ class TestClient:
 
         class Result:
             def __init__(self, resp):
-                self.status_code = 200
+                self.status_code = getattr(resp, "status_code", 200)
                 self.text = getattr(resp, "content", resp)
                 self.headers = getattr(resp, "headers", {})
                 self._resp = resp
@@ -71,6 +71,9 @@ class TestClient:
                     async def send_text(self, text: str):
                         self._out.append(text)
 
+                    async def close(self, code: int = 1000):
+                        self.close_code = code
+
                 ws = FakeWS(self.incoming, self.outgoing)
                 if inspect.iscoroutinefunction(self.handler):
                     await self.handler(ws)
@@ -96,7 +99,7 @@ class TestClient:
 
         class Result:
             def __init__(self, resp):
-                self.status_code = 200
+                self.status_code = getattr(resp, "status_code", 200)
                 self.text = getattr(resp, "content", resp)
                 self.headers = getattr(resp, "headers", {})
                 self._resp = resp